@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Индекс подсказок загружается при старте воркера
+from work_table.suggest import suggest_index  # noqa: E402
+
+suggest_index.warm_up()
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'work_table',
     'django_filters',
@@ -157,13 +158,28 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'work_table.authentication.CookieJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
             'django_filters.rest_framework.DjangoFilterBackend'
         ],
 }
 
+LOGIN_THROTTLE = {
+    'LOGIN_FAILURES': 5,
+    'IP_FAILURES': 20,
+    'WINDOW': 60 * 5,
+    'LOCKOUT': 30,
+    'MAX_LOCKOUT': 60 * 60,
+}
+
+# Push-события для панели администратора и каталога (work_table.live)
+LIVE_EVENTS = {
+    'BROKER': 'redis',  # 'memory' - без Redis, только внутри одного процесса
+    'HEARTBEAT_INTERVAL': 15,
+    'QUEUE_SIZE': 100,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from django.db.models import Prefetch
 from .models import (
     AuthorsBooks,
     AuthorsCatalog,
@@ -86,6 +87,12 @@ class BooksCatalogAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
+            'genres'
+        )
+
     def title_with_cover(self, obj):
         if obj.cover:
             return format_html(
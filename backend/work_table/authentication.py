@@ -0,0 +1,144 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ReadersCatalog
+
+logger = logging.getLogger(__name__)
+
+# Поля читателя, которых достаточно для проверки прав и владельца
+IDENTITY_FIELDS = ['id', 'login', 'admin', 'is_active', 'surname', 'name']
+IDENTITY_CACHE_TIMEOUT = 60 * 5
+# Поля, подписанные в access_token (см. CustomAccessToken)
+TOKEN_CLAIM_FIELDS = ['id', 'login', 'admin', 'is_active']
+# Отзыв хранится, пока могут быть живы выданные до него access-токены
+REVOCATION_TIMEOUT = int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()) + 60
+
+
+def identity_cache_key(reader_id):
+    return f'reader_identity_{reader_id}'
+
+
+def invalidate_reader_identity(*reader_ids):
+    """Сбрасывает закэшированные учетные данные читателей"""
+    cache.delete_many([identity_cache_key(reader_id) for reader_id in reader_ids])
+
+
+def revocation_key(reader_id):
+    return f'reader_tokens_revoked_{reader_id}'
+
+
+def revoke_reader_tokens(*reader_ids):
+    """
+    Отзывает access-токены читателей, выданные до текущего момента.
+    Вызывается при смене прав, деактивации и удалении читателя.
+    Время хранится с долями секунды: токен, выданный в ту же секунду
+    сразу после отзыва, остается действительным.
+    """
+    revoked_at = time.time()
+    cache.set_many(
+        {revocation_key(reader_id): revoked_at for reader_id in reader_ids},
+        timeout=REVOCATION_TIMEOUT
+    )
+    invalidate_reader_identity(*reader_ids)
+
+
+def is_token_revoked(token):
+    revoked_at = cache.get(revocation_key(token['user_id']))
+    # iat у CustomAccessToken дробный; у старых токенов - целые секунды,
+    # которые не больше момента отзыва в ту же секунду
+    return revoked_at is not None and token.get('iat', 0) < revoked_at
+
+
+def reader_from_values(values):
+    """
+    Читатель из части полей {attname: значение} без обращения к БД.
+    from_db ждет значения в порядке _meta.concrete_fields (первое поле модели -
+    is_active), поэтому список строится в этом порядке, а не в порядке values.
+    Остальные поля отложены и подгрузятся из БД при обращении
+    """
+    field_names = [
+        field.attname for field in ReadersCatalog._meta.concrete_fields
+        if field.attname in values
+    ]
+    return ReadersCatalog.from_db('default', field_names, [values[name] for name in field_names])
+
+
+def reader_from_claims(token):
+    """Читатель из подписанных claims токена, без обращения к БД"""
+    return reader_from_values({
+        'id': token['user_id'],
+        'login': token['login'],
+        'admin': token['admin'],
+        'is_active': token['is_active'],
+    })
+
+
+def load_reader_identity(reader_id):
+    """
+    Возвращает читателя только с полями IDENTITY_FIELDS.
+    Остальные поля отложены и подгрузятся из БД при обращении.
+    """
+    key = identity_cache_key(reader_id)
+    identity = cache.get(key)
+
+    if identity is None:
+        identity = ReadersCatalog.objects.filter(id=reader_id).values(*IDENTITY_FIELDS).first()
+        if identity is None:
+            return None
+        cache.set(key, identity, timeout=IDENTITY_CACHE_TIMEOUT)
+
+    return reader_from_values(identity)
+
+
+def get_request_reader(request):
+    """Текущий читатель запроса или None для анонимного пользователя"""
+    user = getattr(request, 'user', None)
+    if isinstance(user, ReadersCatalog):
+        return user
+    return None
+
+
+class CookieJWTAuthentication(BaseAuthentication):
+    """
+    Аутентификация по access_token из куки.
+    DRF вызывает её один раз на запрос и запоминает результат в request.user.
+    Права и статус читателя берутся из подписанных claims токена, проверяется
+    только отзыв токена. Для токенов без claims (выданных до их появления)
+    данные читателя читаются из Redis-кэша или БД.
+    Недействительный токен не считается ошибкой: запрос продолжается как анонимный,
+    чтобы публичные эндпоинты работали и с просроченной кукой.
+    """
+
+    def authenticate(self, request):
+        access_token = request.COOKIES.get('access_token')
+        if not access_token:
+            return None
+
+        try:
+            token = AccessToken(access_token)
+            user_id = token['user_id']
+        except (TokenError, KeyError) as e:
+            logger.warning(f"Недействительный access_token: {e}")
+            return None
+
+        if is_token_revoked(token):
+            return None
+
+        if 'admin' in token and 'is_active' in token:
+            user = reader_from_claims(token)
+        else:
+            user = load_reader_identity(user_id)
+
+        if user is None or not user.is_active:
+            return None
+
+        return user, token
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
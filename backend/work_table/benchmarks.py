@@ -0,0 +1,199 @@
+import statistics
+import time
+
+from django.db import connection
+
+from .models import BookingCatalog, BooksCatalog, ReadersCatalog
+from .search import book_search_vector
+
+# Синтетические строки помечаются этим префиксом (шифр книги) и удаляются после замера
+BENCH_PREFIX = 'bench-'
+
+BOOKS_TABLE = BooksCatalog._meta.db_table
+READERS_TABLE = ReadersCatalog._meta.db_table
+BOOKING_TABLE = BookingCatalog._meta.db_table
+
+TITLE_WORDS = [
+    'война', 'мир', 'история', 'России', 'математика', 'анализ', 'физика',
+    'химия', 'основы', 'программирование', 'алгоритмы', 'данные', 'теория',
+    'практикум', 'экономика', 'право', 'философия', 'литература', 'язык',
+    'методы', 'системы', 'управление', 'сети', 'базы', 'биология', 'география',
+]
+
+SEED_BOOKS_SQL = f"""
+INSERT INTO "{BOOKS_TABLE}" (
+    "index", authors_mark, title, place_publication, information_publication,
+    volume, quantity_total, quantity_remaining, date_publication, year_publication
+)
+SELECT
+    %s || n,
+    'Б' || (n %% 100),
+    w[1 + (n * 7919) %% cardinality(w)] || ' '
+        || w[1 + (n * 104729) %% cardinality(w)] || ' '
+        || w[1 + (n / 13) %% cardinality(w)],
+    'Москва', 'Учебное пособие', 100 + n %% 400, %s, %s,
+    (1950 + n %% 75)::text, 1950 + n %% 75
+FROM generate_series(%s, %s) n, (SELECT %s::text[] AS w) words
+"""
+
+
+SEED_READERS_SQL = f"""
+INSERT INTO "{READERS_TABLE}" (
+    is_active, surname, name, birthday, education, city, street, house,
+    passport_series, passport_number, issued_by_whom, date_issue, consists_of,
+    phone, login, password, mail, admin
+)
+SELECT
+    true, 'Читатель' || n, 'Тест', DATE '2000-01-01', 'Высшее', 'Москва', 'Ленина', 1,
+    -1, n, 'ОВД', DATE '2020-01-01', DATE '2020-01-01',
+    '+70000000000', %s || 'reader-' || n, '!', %s || n || '@example.com', false
+FROM generate_series(%s, %s) n
+"""
+
+# Каждый читатель бронирует per_reader разных книг подряд начиная со своего смещения,
+# поэтому пара (книга, читатель) уникальна при per_reader <= числа книг
+SEED_BOOKINGS_SQL = f"""
+INSERT INTO "{BOOKING_TABLE}" (index_id, reader_id, quantity, date_issue, date_return, issued, returned)
+SELECT
+    books.ids[1 + (readers.n * 7919 + k) %% cardinality(books.ids)],
+    readers.id, 1, issue.day, issue.day + 30, %s, %s AND random() < 0.8
+FROM (
+    SELECT id, row_number() OVER (ORDER BY id) AS n FROM "{READERS_TABLE}"
+    WHERE login LIKE %s AND id > %s ORDER BY id LIMIT %s
+) readers
+CROSS JOIN generate_series(0, %s - 1) k
+CROSS JOIN (
+    SELECT array_agg(id ORDER BY id) AS ids FROM "{BOOKS_TABLE}" WHERE "index" LIKE %s
+) books
+CROSS JOIN LATERAL (
+    SELECT CURRENT_DATE - (%s + floor(random() * (%s - %s + 1)))::int AS day
+) issue
+"""
+
+# Брони, вставленные мимо BookingCatalog.save, не списаны с остатка: считаем их
+# экземпляры выданными из фонда, чтобы после снятия броней остаток совпал с фондом
+RESERVE_HOLDS_SQL = f"""
+UPDATE "{BOOKS_TABLE}" book
+SET quantity_total = book.quantity_remaining + held.quantity
+FROM (
+    SELECT index_id, SUM(quantity) AS quantity FROM "{BOOKING_TABLE}"
+    WHERE issued = false AND index_id IN (SELECT id FROM "{BOOKS_TABLE}" WHERE "index" LIKE %s)
+    GROUP BY index_id
+) held
+WHERE book.id = held.index_id
+"""
+
+
+def bench_books():
+    return BooksCatalog.objects.filter(index__startswith=BENCH_PREFIX)
+
+
+def seed_books(count, copies=10):
+    """
+    Дополняет синтетические книги до count одним INSERT ... SELECT generate_series
+    и пересчитывает им search_vector. Возвращает число добавленных книг
+    """
+    existing = bench_books().count()
+    if existing >= count:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(SEED_BOOKS_SQL, [BENCH_PREFIX, copies, copies, existing + 1, count, TITLE_WORDS])
+    bench_books().filter(search_vector__isnull=True).update(search_vector=book_search_vector())
+    analyze(BOOKS_TABLE)
+    return count - existing
+
+
+def bench_readers():
+    return ReadersCatalog.objects.filter(login__startswith=BENCH_PREFIX)
+
+
+def bench_bookings():
+    return BookingCatalog.objects.filter(reader__login__startswith=BENCH_PREFIX)
+
+
+def seed_readers(count):
+    """Дополняет синтетических читателей до count. Возвращает число добавленных"""
+    existing = bench_readers().count()
+    if existing >= count:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(SEED_READERS_SQL, [BENCH_PREFIX, BENCH_PREFIX, existing + 1, count])
+    analyze(READERS_TABLE)
+    return count - existing
+
+
+def seed_bookings(per_reader, issued=True, returned=True, min_age_days=0, max_age_days=365,
+                  readers_per_batch=1000, progress=None):
+    """
+    Бронирования синтетических читателей по синтетическим книгам: per_reader на читателя,
+    возраст date_issue равномерно в [min_age_days, max_age_days]. Вставка идет пачками
+    по readers_per_batch читателей; progress(вставлено) вызывается после каждой пачки.
+    Возвращает число вставленных строк
+    """
+    inserted, last_reader_id = 0, 0
+    pattern = f'{BENCH_PREFIX}%'
+    while True:
+        batch = list(
+            bench_readers().filter(id__gt=last_reader_id).order_by('id')
+            .values_list('id', flat=True)[:readers_per_batch]
+        )
+        if not batch:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_BOOKINGS_SQL, [
+                issued, returned, pattern, last_reader_id, readers_per_batch,
+                per_reader, pattern, min_age_days, max_age_days, min_age_days,
+            ])
+            inserted += cursor.rowcount
+        last_reader_id = batch[-1]
+        if progress:
+            progress(inserted)
+    analyze(BOOKING_TABLE)
+    return inserted
+
+
+def reserve_bench_holds():
+    """Согласует фонд синтетических книг с их невыданными бронями. Возвращает число книг"""
+    with connection.cursor() as cursor:
+        cursor.execute(RESERVE_HOLDS_SQL, [f'{BENCH_PREFIX}%'])
+        return cursor.rowcount
+
+
+def delete_bench_bookings():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM "{BOOKING_TABLE}" WHERE reader_id IN '
+            f'(SELECT id FROM "{READERS_TABLE}" WHERE login LIKE %s)',
+            [f'{BENCH_PREFIX}%']
+        )
+        return cursor.rowcount
+
+
+def delete_bench_readers():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{READERS_TABLE}" WHERE login LIKE %s', [f'{BENCH_PREFIX}%'])
+        return cursor.rowcount
+
+
+def delete_bench_books():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{BOOKS_TABLE}" WHERE "index" LIKE %s', [f'{BENCH_PREFIX}%'])
+        return cursor.rowcount
+
+
+def analyze(*tables):
+    """Обновляет статистику планировщика после массовой вставки"""
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'ANALYZE "{table}"')
+
+
+def measure(func, repeat=5):
+    """(медиана, минимум) времени вызова func в миллисекундах и результат последнего вызова"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), min(timings), result
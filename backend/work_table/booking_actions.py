@@ -0,0 +1,117 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .catalog_cache import bump_catalog_version
+from .models import BookingCatalog, BookingDailyStats, BooksCatalog
+from .counters import adjust_counters
+from .debtors import refresh_readers
+from .holds import unschedule_holds
+from .popularity import record_issued_delta
+
+ACTION_ISSUE = 'issue'
+ACTION_RETURN = 'return'
+ACTION_CANCEL = 'cancel'
+BOOKING_ACTIONS = (ACTION_ISSUE, ACTION_RETURN, ACTION_CANCEL)
+
+
+def check_action(booking, action):
+    """Текст ошибки, если действие к бронированию неприменимо, иначе None"""
+    if action == ACTION_ISSUE and booking.issued:
+        return "Книга уже выдана"
+    if action == ACTION_RETURN:
+        if not booking.issued:
+            return "Невозможно вернуть невыданную книгу"
+        if booking.returned:
+            return "Книга уже возвращена"
+    if action == ACTION_CANCEL and booking.issued:
+        return "Невозможно отменить выданное бронирование"
+    return None
+
+
+def apply_booking_actions(items):
+    """
+    Выдача, возврат и отмена пачки бронирований в одной транзакции.
+    Сначала блокируются книги, затем бронирования (SELECT ... FOR UPDATE,
+    в порядке id) - тот же порядок, что у BookingCatalog.save/delete и
+    снятия броней, поэтому пачки и одиночные операции не взаимоблокируются.
+    Изменения остатков суммируются по книге и применяются одним UPDATE на книгу.
+    Ошибка отдельного элемента не отменяет остальные.
+    Возвращает результаты в порядке элементов: {id, action, status, detail?}
+    """
+    booking_ids = sorted({item['id'] for item in items})
+    results = []
+
+    with transaction.atomic():
+        book_ids = set(
+            BookingCatalog.objects.filter(id__in=booking_ids).values_list('index_id', flat=True)
+        )
+        BooksCatalog.lock_rows(*book_ids)
+        bookings = {
+            booking.id: booking
+            for booking in BookingCatalog.objects.select_for_update()
+            .filter(id__in=booking_ids).order_by('id')
+        }
+        # Книгу брони могли сменить до блокировки - блокируем и ее
+        missing = {booking.index_id for booking in bookings.values()} - book_ids
+        if missing:
+            BooksCatalog.lock_rows(*missing)
+
+        selected = {action: [] for action in BOOKING_ACTIONS}
+        remaining_deltas = defaultdict(int)
+        issues, returns = Counter(), Counter()
+        seen = set()
+
+        for item in items:
+            booking_id, action = item['id'], item['action']
+            result = {'id': booking_id, 'action': action}
+            booking = bookings.get(booking_id)
+
+            if booking is None:
+                error = "Бронирование не найдено"
+            elif booking_id in seen:
+                error = "Бронирование уже обработано в этом запросе"
+            else:
+                error = check_action(booking, action)
+
+            if error:
+                results.append({**result, 'status': 'error', 'detail': error})
+                continue
+
+            seen.add(booking_id)
+            selected[action].append(booking_id)
+            if action == ACTION_ISSUE:
+                issues[booking.index_id] += 1
+            elif action == ACTION_RETURN:
+                returns[booking.index_id] += 1
+                remaining_deltas[booking.index_id] += booking.quantity
+            else:
+                remaining_deltas[booking.index_id] += booking.quantity
+            results.append({**result, 'status': 'ok'})
+
+        if selected[ACTION_ISSUE]:
+            BookingCatalog.objects.filter(id__in=selected[ACTION_ISSUE]).update(issued=True)
+        if selected[ACTION_RETURN]:
+            BookingCatalog.objects.filter(id__in=selected[ACTION_RETURN]).update(returned=True)
+        if selected[ACTION_CANCEL]:
+            # QuerySet.delete не вызывает BookingCatalog.delete, остаток возвращается ниже.
+            # Обработчиков post_delete у бронирований нет, поэтому это один DELETE,
+            # а кэш каталога сбрасывается один раз на пачку
+            BookingCatalog.objects.filter(id__in=selected[ACTION_CANCEL]).delete()
+        for book_id, delta in sorted(remaining_deltas.items()):
+            BooksCatalog.change_remaining(book_id, delta, bump_cache=False)
+
+        for book_id, count in issues.items():
+            record_issued_delta(book_id, count)
+        unschedule_holds(selected[ACTION_ISSUE] + selected[ACTION_CANCEL])
+        adjust_counters(bookings=-len(selected[ACTION_RETURN]) - len(selected[ACTION_CANCEL]))
+        refresh_readers(*(
+            bookings[booking_id].reader_id
+            for booking_id in selected[ACTION_ISSUE] + selected[ACTION_RETURN]
+        ))
+        for book_id in issues.keys() | returns.keys():
+            BookingDailyStats.record(book_id, issues=issues[book_id], returns=returns[book_id])
+
+    if any(selected.values()):
+        bump_catalog_version()
+    return results
@@ -0,0 +1,74 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog_version'
+CATALOG_CHANGES_SEQ_KEY = 'catalog_changes_seq'
+CATALOG_CHANGES_TIMEOUT = 60 * 60 * 24
+CATALOG_CHANGES_MAX_BATCH = 500
+
+
+def get_catalog_version():
+    """Текущее поколение каталога. Входит в ключи всех кэшей каталога"""
+    return cache.get_or_set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def bump_catalog_version(book_ids=(), author_ids=(), rebuild=False):
+    """
+    Инвалидирует все кэши каталога за O(1): старые ключи просто перестают
+    запрашиваться и вытесняются по таймауту.
+    Если изменились названия, шифры или авторы, изменение записывается
+    в журнал для индексов в памяти процесса (см. work_table.suggest).
+    """
+    cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+    version = cache.incr(CATALOG_VERSION_KEY)
+    if book_ids or author_ids or rebuild:
+        log_catalog_change({
+            'books': list(book_ids),
+            'authors': list(author_ids),
+            'rebuild': rebuild,
+        })
+    return version
+
+
+def log_catalog_change(change):
+    cache.add(CATALOG_CHANGES_SEQ_KEY, 0, timeout=None)
+    seq = cache.incr(CATALOG_CHANGES_SEQ_KEY)
+    cache.set(f'catalog_change_{seq}', change, timeout=CATALOG_CHANGES_TIMEOUT)
+    return seq
+
+
+def get_catalog_changes(since):
+    """
+    Изменения каталога после номера since: (последний номер, список изменений).
+    Вместо списка возвращается None, если журнал неполон и нужна полная перестройка.
+    """
+    seq = cache.get(CATALOG_CHANGES_SEQ_KEY, 0)
+    if seq <= since:
+        return seq, []
+    if seq - since > CATALOG_CHANGES_MAX_BATCH:
+        return seq, None
+
+    keys = [f'catalog_change_{n}' for n in range(since + 1, seq + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return seq, None
+    return seq, [changes[key] for key in keys]
+
+
+def normalize_query_params(query_params, exclude=()):
+    """Параметры запроса в каноническом виде: порядок ключей не влияет на результат"""
+    items = []
+    for key in sorted(query_params.keys()):
+        if key in exclude:
+            continue
+        for value in query_params.getlist(key):
+            items.append((key, value.strip()))
+    return urlencode(items)
+
+
+def catalog_cache_key(prefix, query_params, exclude=()):
+    normalized = normalize_query_params(query_params, exclude)
+    digest = hashlib.md5(normalized.encode('utf-8')).hexdigest()
+    return f'{prefix}_v{get_catalog_version()}_{digest}'
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .live import publish_stats
+from .models import BookingCatalog, BooksCatalog, OrderCatalog, ReadersCatalog
+
+# Redis hash со счетчиками для StatisticsView
+LIBRARY_COUNTERS_KEY = 'library_counters'
+COUNTER_FIELDS = ('books', 'users', 'orders', 'bookings')
+
+# Все показатели одним запросом: по каждой таблице один проход с условными COUNT
+EXACT_COUNTERS_SQL = f"""
+SELECT
+    (SELECT COUNT(*) FROM "{BooksCatalog._meta.db_table}") AS books,
+    (SELECT COUNT(*) FROM "{ReadersCatalog._meta.db_table}") AS users,
+    (SELECT COUNT(*) FROM "{OrderCatalog._meta.db_table}" WHERE NOT confirmed) AS orders,
+    booking.bookings,
+    booking.debtors
+FROM (
+    SELECT
+        COUNT(*) FILTER (WHERE NOT returned) AS bookings,
+        COUNT(DISTINCT reader_id) FILTER (
+            WHERE issued AND NOT returned AND date_return < %s
+        ) AS debtors
+    FROM "{BookingCatalog._meta.db_table}"
+) AS booking
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _key():
+    return cache.make_key(LIBRARY_COUNTERS_KEY)
+
+
+def adjust_counters(**deltas):
+    """
+    Меняет счетчики после фиксации транзакции, в которой прошла запись
+    (при откате изменение не применяется)
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def apply():
+        pipe = _redis().pipeline()
+        for field, delta in deltas.items():
+            pipe.hincrby(_key(), field, delta)
+        pipe.execute()
+
+    transaction.on_commit(apply)
+    publish_stats(delta=deltas)
+
+
+def exact_counters():
+    """Точные значения: books, users, orders, bookings, debtors"""
+    with connection.cursor() as cursor:
+        cursor.execute(EXACT_COUNTERS_SQL, [timezone.now().date()])
+        row = cursor.fetchone()
+        columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, row))
+
+
+def reconcile_counters():
+    """Сверяет счетчики с таблицами и возвращает точные значения"""
+    counters = exact_counters()
+    _redis().hset(_key(), mapping={field: counters[field] for field in COUNTER_FIELDS})
+    return counters
+
+
+def get_counters():
+    """Счетчики из Redis; если хэша нет (первый запуск, очистка Redis) - сверяет их"""
+    values = _redis().hgetall(_key())
+    counters = {field.decode(): int(value) for field, value in values.items()}
+    if not all(field in counters for field in COUNTER_FIELDS):
+        counters = reconcile_counters()
+    return {field: counters[field] for field in COUNTER_FIELDS}
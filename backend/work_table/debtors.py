@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .live import publish_stats
+from .models import BookingCatalog
+
+# ZSET: reader_id -> самая ранняя date_return (toordinal) среди выданных и невозвращенных книг.
+# Должники - читатели со значением меньше сегодняшней даты
+READER_DUE_KEY = 'reader_earliest_due'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _key():
+    return cache.make_key(READER_DUE_KEY)
+
+
+def outstanding_bookings():
+    # Такие запросы обслуживает частичный индекс booking_debtors_idx
+    return BookingCatalog.objects.filter(issued=True, returned=False)
+
+
+def rebuild_debtors():
+    """Пересобирает ZSET одним агрегирующим запросом и атомарно подменяет текущий"""
+    due = outstanding_bookings().values('reader_id').annotate(
+        earliest=Min('date_return')
+    ).values_list('reader_id', 'earliest')
+    mapping = {reader_id: earliest.toordinal() for reader_id, earliest in due}
+
+    redis = _redis()
+    tmp_key = f'{_key()}:rebuild'
+    pipe = redis.pipeline()
+    pipe.delete(tmp_key)
+    if mapping:
+        pipe.zadd(tmp_key, mapping)
+    # Пустой ZSET в Redis не хранится, поэтому отмечаем, что индекс построен
+    pipe.zadd(tmp_key, {'built': float('inf')})
+    pipe.rename(tmp_key, _key())
+    pipe.execute()
+    return len(mapping)
+
+
+def refresh_readers(*reader_ids):
+    """Пересчитывает срок для читателей после выдачи, возврата или смены даты возврата"""
+    reader_ids = set(reader_ids)
+    if not reader_ids:
+        return
+
+    def apply():
+        due = dict(
+            outstanding_bookings().filter(reader_id__in=reader_ids)
+            .values('reader_id').annotate(earliest=Min('date_return'))
+            .values_list('reader_id', 'earliest')
+        )
+        pipe = _redis().pipeline()
+        for reader_id in reader_ids:
+            if reader_id in due:
+                pipe.zadd(_key(), {reader_id: due[reader_id].toordinal()})
+            else:
+                pipe.zrem(_key(), reader_id)
+        pipe.execute()
+        publish_stats(values={'debtors': debtor_count()})
+
+    transaction.on_commit(apply)
+
+
+def _ensure_built(redis):
+    if redis.zscore(_key(), 'built') is None:
+        rebuild_debtors()
+
+
+def debtor_ids():
+    redis = _redis()
+    _ensure_built(redis)
+    today = timezone.now().date().toordinal()
+    return [int(reader_id) for reader_id in redis.zrangebyscore(_key(), '-inf', f'({today}')]
+
+
+def debtor_count():
+    redis = _redis()
+    _ensure_built(redis)
+    today = timezone.now().date().toordinal()
+    return redis.zcount(_key(), '-inf', f'({today}')
@@ -0,0 +1,144 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import AuthorsBooks, BookingCatalog, BooksCatalog, ReadersCatalog
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+AUTHORS_COLUMN = 'authors'
+
+# Сущность -> (queryset, [(заголовок, поле values_list или AUTHORS_COLUMN)]).
+# Паспортные данные и пароль читателей не выгружаются
+EXPORT_ENTITIES = {
+    'books': (
+        lambda: BooksCatalog.objects.order_by('id'),
+        [
+            ('id', 'id'), ('index', 'index'), ('title', 'title'),
+            ('authors', AUTHORS_COLUMN), ('authors_mark', 'authors_mark'),
+            ('place_publication', 'place_publication'),
+            ('information_publication', 'information_publication'),
+            ('date_publication', 'date_publication'), ('volume', 'volume'),
+            ('quantity_total', 'quantity_total'), ('quantity_remaining', 'quantity_remaining'),
+        ],
+    ),
+    'bookings': (
+        lambda: BookingCatalog.objects.order_by('id'),
+        [
+            ('id', 'id'), ('book_id', 'index_id'), ('book_title', 'index__title'),
+            ('authors', AUTHORS_COLUMN), ('reader_id', 'reader_id'),
+            ('reader_surname', 'reader__surname'), ('reader_name', 'reader__name'),
+            ('quantity', 'quantity'), ('date_issue', 'date_issue'),
+            ('date_return', 'date_return'), ('issued', 'issued'), ('returned', 'returned'),
+        ],
+    ),
+    'readers': (
+        lambda: ReadersCatalog.objects.order_by('id'),
+        [
+            ('id', 'id'), ('login', 'login'), ('surname', 'surname'), ('name', 'name'),
+            ('patronymic', 'patronymic'), ('mail', 'mail'), ('phone', 'phone'),
+            ('city', 'city'), ('consists_of', 'consists_of'),
+            ('re_registration', 're_registration'), ('is_active', 'is_active'),
+            ('admin', 'admin'),
+        ],
+    ),
+}
+
+# Поле, по которому для колонки authors ищется книга
+AUTHORS_BOOK_FIELD = {'books': 'id', 'bookings': 'index_id'}
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: writerow возвращает строку вместо записи"""
+    def write(self, value):
+        return value
+
+
+def author_names_map():
+    """{book_id: "Фамилия И., ..."} одним проходом по AuthorsBooks серверным курсором"""
+    names = defaultdict(list)
+    rows = AuthorsBooks.objects.order_by('book_id', 'id').values_list(
+        'book_id', 'author__author_surname', 'author__author_name'
+    )
+    for book_id, surname, name in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        names[book_id].append(f"{surname} {name[:1]}." if name else surname)
+    return {book_id: ', '.join(authors) for book_id, authors in names.items()}
+
+
+def export_rows(entity, filters=None):
+    """
+    Генератор: сначала заголовки, затем строки кортежами.
+    Строки читаются values_list через iterator (серверный курсор PostgreSQL),
+    поэтому память не зависит от размера таблицы
+    """
+    get_queryset, columns = EXPORT_ENTITIES[entity]
+    headers = [header for header, _ in columns]
+    yield headers
+
+    fields = [field for _, field in columns if field != AUTHORS_COLUMN]
+    if AUTHORS_COLUMN in (field for _, field in columns):
+        book_field = AUTHORS_BOOK_FIELD[entity]
+        if book_field not in fields:
+            fields.append(book_field)
+        # Карта строится после заголовков, чтобы первый байт ушел сразу
+        authors = author_names_map()
+    else:
+        book_field, authors = None, None
+
+    queryset = get_queryset().filter(**(filters or {})).values_list(*fields)
+    positions = {field: position for position, field in enumerate(fields)}
+    for values in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = []
+        for _, field in columns:
+            if field == AUTHORS_COLUMN:
+                row.append(authors.get(values[positions[book_field]], ''))
+            else:
+                row.append(values[positions[field]])
+        yield row
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    # BOM, чтобы Excel открывал UTF-8 с кириллицей
+    yield '\ufeff'
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    headers = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def stream_export(entity, export_format, filters=None):
+    rows = export_rows(entity, filters)
+    if export_format == 'csv':
+        return stream_csv(rows)
+    return stream_ndjson(rows)
+
+
+async def astream_export(entity, export_format, filters=None):
+    """
+    stream_export для ASGI. Синхронный генератор Django под ASGI собирает
+    в память целиком, поэтому строки забираются пачками по EXPORT_CHUNK_SIZE
+    через sync_to_async. thread_sensitive=True держит генератор и его
+    серверный курсор в одном потоке
+    """
+    lines = stream_export(entity, export_format, filters)
+    next_chunk = sync_to_async(lambda size: list(islice(lines, size)), thread_sensitive=True)
+    # Первая пачка - одна строка, чтобы первый байт ушел до построения карты авторов
+    size = 1
+    while True:
+        chunk = await next_chunk(size)
+        if not chunk:
+            return
+        yield ''.join(chunk)
+        size = EXPORT_CHUNK_SIZE
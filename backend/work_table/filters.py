@@ -1,11 +1,27 @@
 from django_filters import rest_framework as filters
-from .models import BooksCatalog, OrderCatalog, ReadersCatalog, BookingCatalog
+from .models import (
+    BooksCatalog, OrderCatalog, ReadersCatalog, BookingCatalog,
+    AuthorsBooks, AuthorsCatalog
+)
+from .search import build_search_query
+from .debtors import debtor_ids
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
 from django.utils import timezone
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+AUTHOR_NAME_FIELDS = ('author_surname', 'author_name', 'author_patronymic')
+
 
 class BookFilter(filters.FilterSet):
     author = filters.CharFilter(method='filter_by_author')
     available = filters.BooleanFilter(method='filter_available')
-    year = filters.NumberFilter(method='filter_by_year')
+    year = filters.NumberFilter(field_name='year_publication')
+    year_min = filters.NumberFilter(field_name='year_publication', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year_publication', lookup_expr='lte')
+    multiple_authors = filters.CharFilter(method='filter_multiple_authors')
+    # Нечеткое (по триграммам) сравнение для author и multiple_authors
+    author_fuzzy = filters.BooleanFilter(method='filter_author_fuzzy')
 
     class Meta:
         model = BooksCatalog
@@ -17,26 +33,58 @@ class BookFilter(filters.FilterSet):
         }
 
     def filter_by_author(self, queryset, name, value):
-        return queryset.filter(
-            authorsbooks__author__author_surname__icontains=value
-        )
+        return self.filter_by_author_terms(queryset, [value])
 
     def filter_available(self, queryset, name, value):
         if value:
             return queryset.filter(quantity_remaining__gt=0)
         return queryset.filter(quantity_remaining=0)
 
-    def filter_by_year(self, queryset, name, value):
-        return queryset.filter(date_publication__contains=str(value))
+    def filter_multiple_authors(self, queryset, name, value):
+        return self.filter_by_author_terms(queryset, value.split(','))
 
-    multiple_authors = filters.CharFilter(method='filter_multiple_authors')
+    def filter_author_fuzzy(self, queryset, name, value):
+        # Учитывается в author_term_q
+        return queryset
 
-    def filter_multiple_authors(self, queryset, name, value):
-        surnames = value.split(',')
-        qs = queryset
-        for surname in surnames:
-            qs = qs.filter(authorsbooks__author__author_surname__icontains=surname.strip())
-        return qs
+    def author_term_q(self, term, prefix=''):
+        fuzzy = self.form.cleaned_data.get('author_fuzzy')
+        lookup = 'trigram_similar' if fuzzy else 'icontains'
+        condition = Q()
+        for field in AUTHOR_NAME_FIELDS:
+            condition |= Q(**{f'{prefix}{field}__{lookup}': term})
+        return condition
+
+    def filter_by_author_terms(self, queryset, terms):
+        """
+        Книги, у которых для каждого слова из terms есть подходящий автор.
+        Авторы находятся одним запросом по триграммным GIN-индексам,
+        книги отбираются одним полусоединением (id IN (...)) без дублей.
+        """
+        terms = [term.strip() for term in terms if term.strip()]
+        if not terms:
+            return queryset
+
+        any_term = Q()
+        for term in terms:
+            any_term |= self.author_term_q(term)
+        links = AuthorsBooks.objects.filter(author__in=AuthorsCatalog.objects.filter(any_term))
+
+        if len(terms) > 1:
+            # Для каждого слова - признак, что у книги нашелся такой автор
+            matched = {
+                f'term_{i}': Max(Case(
+                    When(self.author_term_q(term, prefix='author__'), then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField()
+                ))
+                for i, term in enumerate(terms)
+            }
+            links = links.values('book_id').annotate(**matched).filter(
+                **{name: 1 for name in matched}
+            )
+
+        return queryset.filter(id__in=links.values('book_id'))
 
 class OrderFilter(filters.FilterSet):
     title = filters.CharFilter(
@@ -50,7 +98,7 @@ class OrderFilter(filters.FilterSet):
         label='Фамилия автора содержит'
     )
     date_publication = filters.NumberFilter(
-        field_name='date_publication',
+        field_name='year_publication',
         label='Год публикации'
     )
 
@@ -58,6 +106,38 @@ class OrderFilter(filters.FilterSet):
         model = OrderCatalog
         fields = ['title', 'author', 'date_publication']
 
+class BookingFilter(filters.FilterSet):
+    STATUS_CHOICES = (
+        ('held', 'Забронирована'),
+        ('issued', 'Выдана'),
+        ('returned', 'Возвращена'),
+        ('overdue', 'Просрочена'),
+    )
+
+    status = filters.ChoiceFilter(choices=STATUS_CHOICES, method='filter_status', label='Статус')
+    date_from = filters.DateFilter(field_name='date_issue', lookup_expr='gte', label='Дата бронирования с')
+    date_to = filters.DateFilter(field_name='date_issue', lookup_expr='lte', label='Дата бронирования по')
+    book = filters.NumberFilter(field_name='index_id', label='ID книги')
+    search = filters.CharFilter(field_name='index__title', lookup_expr='icontains',
+                                label='Название книги содержит')
+    reader_name = filters.CharFilter(field_name='reader__surname', lookup_expr='icontains',
+                                     label='Фамилия читателя содержит')
+
+    class Meta:
+        model = BookingCatalog
+        fields = ['id', 'status', 'date_from', 'date_to', 'book', 'search', 'reader_name']
+
+    def filter_status(self, queryset, name, value):
+        if value == 'held':
+            return queryset.filter(issued=False)
+        if value == 'issued':
+            return queryset.filter(issued=True, returned=False)
+        if value == 'returned':
+            return queryset.filter(returned=True)
+        if value == 'overdue':
+            return queryset.filter(issued=True, returned=False, date_return__lt=timezone.now().date())
+        return queryset
+
 class DebtorFilter(filters.FilterSet):
     is_debtor = filters.BooleanFilter(method='filter_debtors')
 
@@ -67,11 +147,49 @@ class DebtorFilter(filters.FilterSet):
 
     def filter_debtors(self, queryset, name, value):
         if value:
-            current_date = timezone.now().date()
-            debtors_ids = BookingCatalog.objects.filter(
-                issued=True,
-                returned=False,
-                date_return__lt=current_date
-            ).values_list('reader_id', flat=True).distinct()
-            return queryset.filter(id__in=debtors_ids)
-        return queryset
\ No newline at end of file
+            # Должники берутся из кэша сроков возврата (work_table.debtors)
+            return queryset.filter(id__in=debtor_ids())
+        return queryset
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по search_vector (GIN-индекс, словарь russian).
+    Без явного ?ordering= результаты сортируются по релевантности,
+    поэтому фильтр должен стоять после OrderingFilter.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+
+        query = build_search_query(text)
+        # Шифр книги ищем точным совпадением
+        condition = Q(index=text)
+        if query is not None:
+            condition |= Q(search_vector=query)
+        queryset = queryset.filter(condition)
+
+        if query is not None:
+            queryset = queryset.annotate(rank=SearchRank(F('search_vector'), query))
+            if OrderingFilter.ordering_param not in request.query_params:
+                queryset = queryset.order_by('-rank', 'id')
+        return queryset
+
+
+class BookOrderingFilter(OrderingFilter):
+    """
+    date_publication хранится текстом, поэтому сортировка по нему
+    выполняется по числовому year_publication
+    """
+    field_aliases = {'date_publication': 'year_publication'}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [
+            ('-' if term.startswith('-') else '') + self.field_aliases.get(term.lstrip('-'), term.lstrip('-'))
+            for term in ordering
+        ]
@@ -0,0 +1,205 @@
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .counters import adjust_counters
+from .live import publish_availability
+from .models import BookingCatalog, BooksCatalog
+
+# Невыданная бронь снимается через столько дней после date_issue
+HOLD_EXPIRY_DAYS = 3
+
+# Ключ pg_advisory_lock, чтобы пересекающиеся запуски снятия броней не мешали друг другу
+HOLDS_ADVISORY_LOCK_ID = 7263401
+
+# ZSET: booking_id -> unix-время, когда невыданная бронь истекает
+HOLD_EXPIRY_KEY = 'booking_hold_expiry'
+
+# Атомарно забирает из ZSET до ARGV[2] броней со сроком не позже ARGV[1],
+# поэтому несколько воркеров не снимают одну бронь дважды
+POP_DUE_HOLDS_LUA = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #ids > 0 then
+    redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+BOOKING_TABLE = BookingCatalog._meta.db_table
+BOOKS_TABLE = BooksCatalog._meta.db_table
+
+# Книги броней, которые снимет следующий проход: их строки блокируются заранее
+HOLD_BOOKS_SQL = f"""
+SELECT DISTINCT index_id FROM (
+    SELECT index_id FROM "{BOOKING_TABLE}"
+    WHERE issued = false AND {{condition}}
+    ORDER BY id
+    LIMIT %s
+) candidates
+"""
+
+# Одним запросом: удаляет до limit просроченных броней уже заблокированных книг
+# (DELETE ... RETURNING) и возвращает их количество книгам - один UPDATE на книгу за проход
+RELEASE_HOLDS_SQL = f"""
+WITH expired AS (
+    SELECT id FROM "{BOOKING_TABLE}"
+    WHERE issued = false AND {{condition}} AND index_id = ANY(%s)
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+), deleted AS (
+    DELETE FROM "{BOOKING_TABLE}" booking
+    USING expired
+    WHERE booking.id = expired.id
+    RETURNING booking.index_id, booking.quantity
+), restored AS (
+    SELECT index_id, SUM(quantity) AS quantity, COUNT(*) AS holds
+    FROM deleted
+    GROUP BY index_id
+)
+UPDATE "{BOOKS_TABLE}" book
+SET quantity_remaining = book.quantity_remaining + restored.quantity
+FROM restored
+WHERE book.id = restored.index_id
+RETURNING book.id, restored.holds, book.quantity_remaining
+"""
+
+
+def expired_holds_cutoff():
+    """Брони с date_issue не позже этой даты считаются просроченными"""
+    return timezone.now().date() - timedelta(days=HOLD_EXPIRY_DAYS)
+
+
+def expired_holds(cutoff=None):
+    return BookingCatalog.objects.filter(
+        issued=False,
+        date_issue__lte=cutoff or expired_holds_cutoff(),
+    )
+
+
+def expired_holds_summary(cutoff=None):
+    return expired_holds(cutoff).aggregate(holds=Count('id'), copies=Sum('quantity'))
+
+
+def _release(condition, params, limit):
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Книги блокируются раньше броней, как в BookingCatalog.delete и booking_actions
+        cursor.execute(HOLD_BOOKS_SQL.format(condition=condition), [*params, limit])
+        book_ids = BooksCatalog.lock_rows(*(book_id for book_id, in cursor.fetchall()))
+        cursor.execute(RELEASE_HOLDS_SQL.format(condition=condition), [*params, book_ids, limit])
+        rows = cursor.fetchall()
+        released = sum(holds for _, holds, _ in rows)
+        adjust_counters(bookings=-released)
+        for book_id, _, quantity_remaining in rows:
+            publish_availability(book_id, quantity_remaining=quantity_remaining)
+    return released, [book_id for book_id, _, _ in rows]
+
+
+def release_expired_holds_chunk(cutoff, batch_size, book_ids=None):
+    """
+    Снимает до batch_size просроченных броней (только по книгам book_ids, если заданы).
+    Возвращает (число броней, id книг)
+    """
+    if book_ids is None:
+        return _release('date_issue <= %s', [cutoff], batch_size)
+    return _release('date_issue <= %s AND index_id = ANY(%s)', [cutoff, list(book_ids)], batch_size)
+
+
+def release_holds(booking_ids):
+    """
+    Снимает указанные брони, если они все еще не выданы и действительно истекли.
+    Возвращает (число броней, id книг)
+    """
+    return _release('id = ANY(%s) AND date_issue <= %s',
+                    [list(booking_ids), expired_holds_cutoff()], len(booking_ids))
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _key():
+    return cache.make_key(HOLD_EXPIRY_KEY)
+
+
+def hold_expires_at(date_issue):
+    """Момент, начиная с которого бронь попадает под expired_holds_cutoff (дата по UTC, как timezone.now)"""
+    expiry_day = date_issue + timedelta(days=HOLD_EXPIRY_DAYS)
+    return datetime.combine(expiry_day, time.min, tzinfo=dt_timezone.utc).timestamp()
+
+
+def schedule_holds(bookings):
+    """Регистрирует сроки истечения броней [(id, date_issue)] после фиксации транзакции"""
+    mapping = {booking_id: hold_expires_at(date_issue) for booking_id, date_issue in bookings}
+    if mapping:
+        transaction.on_commit(lambda: _redis().zadd(_key(), mapping))
+
+
+def unschedule_holds(booking_ids):
+    booking_ids = list(booking_ids)
+    if booking_ids:
+        transaction.on_commit(lambda: _redis().zrem(_key(), *booking_ids))
+
+
+def schedule_pending_holds():
+    """Регистрирует все невыданные брони (после очистки Redis или при первом запуске)"""
+    pending = BookingCatalog.objects.filter(issued=False).values_list('id', 'date_issue')
+    mapping = {booking_id: hold_expires_at(date_issue) for booking_id, date_issue in pending.iterator()}
+    if mapping:
+        _redis().zadd(_key(), mapping)
+    return len(mapping)
+
+
+def pop_due_holds(limit=500):
+    """Забирает из ZSET id броней, срок которых уже наступил"""
+    redis = _redis()
+    ids = redis.register_script(POP_DUE_HOLDS_LUA)(
+        keys=[_key()], args=[timezone.now().timestamp(), limit]
+    )
+    return [int(booking_id) for booking_id in ids]
+
+
+def process_due_holds(limit=500):
+    """
+    Один шаг воркера: снимает истекшие брони из ZSET через тот же
+    атомарный SQL, что и cleanup_expired_bookings. Брони, которые снять
+    нельзя (срок сдвинули), регистрируются заново, выданные - отбрасываются.
+    Возвращает (число снятых броней, id книг)
+    """
+    booking_ids = pop_due_holds(limit)
+    if not booking_ids:
+        return 0, []
+    try:
+        released, book_ids = release_holds(booking_ids)
+    except Exception:
+        # Вернем в очередь, чтобы не потерять брони при сбое БД
+        _redis().zadd(_key(), {booking_id: timezone.now().timestamp() for booking_id in booking_ids})
+        raise
+
+    if released < len(booking_ids):
+        schedule_holds(
+            BookingCatalog.objects.filter(id__in=booking_ids, issued=False).values_list('id', 'date_issue')
+        )
+    return released, book_ids
+
+
+@contextmanager
+def advisory_lock(lock_id=HOLDS_ADVISORY_LOCK_ID):
+    """
+    Неблокирующий сессионный pg_try_advisory_lock:
+    with advisory_lock() as acquired: ...
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
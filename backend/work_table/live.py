@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIVE_EVENTS = {
+    # 'redis' - между всеми процессами через Redis pub/sub,
+    # 'memory' - только внутри процесса (тесты, runserver)
+    'BROKER': 'redis',
+    'HEARTBEAT_INTERVAL': 15,
+    'QUEUE_SIZE': 100,
+}
+
+LIVE_EVENTS_CHANNEL = 'live_events'
+
+EVENT_AVAILABILITY = 'availability'
+EVENT_STATS = 'stats'
+# Статистика библиотеки отдается только администраторам
+ADMIN_EVENTS = {EVENT_STATS}
+
+
+def get_live_settings():
+    return {**DEFAULT_LIVE_EVENTS, **getattr(settings, 'LIVE_EVENTS', {})}
+
+
+class InMemoryBroker:
+    """Доставляет события подписчикам текущего процесса без Redis"""
+
+    def publish(self, message):
+        hub.dispatch(message)
+
+    async def listen(self):
+        # События приходят напрямую через publish -> hub.dispatch
+        await asyncio.Event().wait()
+        yield
+
+
+class RedisBroker:
+    """Redis pub/sub: одна подписка на процесс, дальше события раздает LiveHub"""
+
+    def channel(self):
+        return cache.make_key(LIVE_EVENTS_CHANNEL)
+
+    def publish(self, message):
+        from django_redis import get_redis_connection
+        get_redis_connection('default').publish(self.channel(), message)
+
+    async def listen(self):
+        import redis.asyncio as aioredis
+
+        client = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel())
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield message['data'].decode('utf-8')
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class Subscriber:
+    def __init__(self, admin, queue_size):
+        self.admin = admin
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, event_type, message):
+        if event_type in ADMIN_EVENTS and not self.admin:
+            return
+        if self.queue.full():
+            # Медленный клиент теряет самое старое событие, а не тормозит остальных
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class LiveHub:
+    """
+    Раздача событий открытым SSE-соединениям процесса.
+    Сколько бы вкладок ни было открыто, процесс держит одну подписку на брокер
+    и не обращается к PostgreSQL.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.listener = None
+        self.broker = None
+
+    def get_broker(self):
+        if self.broker is None:
+            self.broker = InMemoryBroker() if get_live_settings()['BROKER'] == 'memory' else RedisBroker()
+        return self.broker
+
+    def subscribe(self, admin):
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(admin, get_live_settings()['QUEUE_SIZE'])
+        self.subscribers.add(subscriber)
+        if self.listener is None or self.listener.done():
+            self.listener = self.loop.create_task(self.listen())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def dispatch(self, message):
+        """Потокобезопасно: вызывается из синхронного кода представлений"""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.fanout, message)
+
+    def fanout(self, message):
+        event_type = json.loads(message).get('type')
+        for subscriber in list(self.subscribers):
+            subscriber.offer(event_type, message)
+
+    async def listen(self):
+        while self.subscribers:
+            try:
+                async for message in self.get_broker().listen():
+                    self.fanout(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live events subscription failed: {e}")
+                await asyncio.sleep(1)
+
+
+hub = LiveHub()
+
+
+def publish_event(event_type, **payload):
+    """Публикует событие после фиксации транзакции. Ошибка брокера не ломает запись"""
+    message = json.dumps({'type': event_type, **payload})
+
+    def send():
+        try:
+            hub.get_broker().publish(message)
+        except Exception as e:
+            logger.warning(f"Live event is not published: {e}")
+
+    transaction.on_commit(send)
+
+
+def publish_availability(book_id, delta=None, quantity_remaining=None):
+    """Изменение остатка: delta - относительное, quantity_remaining - новое значение"""
+    if quantity_remaining is not None:
+        publish_event(EVENT_AVAILABILITY, book_id=book_id, quantity_remaining=quantity_remaining)
+    elif delta:
+        publish_event(EVENT_AVAILABILITY, book_id=book_id, delta=delta)
+
+
+def publish_stats(delta=None, values=None):
+    publish_event(EVENT_STATS, delta=delta or {}, values=values or {})
+
+
+async def event_stream(subscriber):
+    """Поток text/event-stream: события подписчика и комментарии-heartbeat"""
+    heartbeat = get_live_settings()['HEARTBEAT_INTERVAL']
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            event_type = json.loads(message)['type']
+            yield f'event: {event_type}\ndata: {message}\n\n'
+    finally:
+        hub.unsubscribe(subscriber)
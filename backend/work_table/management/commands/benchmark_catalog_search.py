@@ -0,0 +1,61 @@
+from django.contrib.postgres.search import SearchRank
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from work_table.benchmarks import bench_books, delete_bench_books, measure, seed_books
+from work_table.catalog_cache import bump_catalog_version
+from work_table.models import BooksCatalog
+from work_table.search import build_search_query
+
+PAGE_SIZE = 12
+
+
+def ilike_page(term):
+    # Прежний поиск: title ILIKE '%term%' + COUNT для пагинации
+    queryset = BooksCatalog.objects.defer('search_vector').filter(title__icontains=term)
+    return queryset.count(), list(queryset.order_by('title', 'id')[:PAGE_SIZE])
+
+
+def fts_page(term):
+    # Как FullTextSearchFilter: search_vector @@ query, сортировка по релевантности
+    query = build_search_query(term)
+    queryset = BooksCatalog.objects.defer('search_vector').filter(search_vector=query)
+    ranked = queryset.annotate(rank=SearchRank(F('search_vector'), query)).order_by('-rank', 'id')
+    return queryset.count(), list(ranked[:PAGE_SIZE])
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер поиска по каталогу: ILIKE по названию против полнотекстового "
+        "поиска по search_vector на синтетических книгах (по умолчанию 1 000 000)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000_000,
+                            help="Сколько синтетических книг должно быть в каталоге")
+        parser.add_argument('--repeat', type=int, default=5, help="Повторов каждого запроса")
+        parser.add_argument('--terms', nargs='+', default=['война', 'математика', 'теория систем'])
+        parser.add_argument('--keep', action='store_true',
+                            help="Не удалять синтетические книги после замера")
+
+    def handle(self, *args, **options):
+        seeded, _, added = measure(lambda: seed_books(options['books']), repeat=1)
+        self.stdout.write(f"Seeded {added} books in {seeded / 1000:.1f} s "
+                          f"({bench_books().count()} synthetic books total)")
+        if added:
+            bump_catalog_version(rebuild=True)
+
+        try:
+            self.stdout.write(f"{'term':<20} {'rows':>8} {'ILIKE, ms':>12} {'FTS rows':>9} {'FTS, ms':>10}")
+            for term in options['terms']:
+                ilike_ms, _, (ilike_rows, _) = measure(lambda: ilike_page(term), options['repeat'])
+                fts_ms, _, (fts_rows, _) = measure(lambda: fts_page(term), options['repeat'])
+                self.stdout.write(
+                    f"{term:<20} {ilike_rows:>8} {ilike_ms:>12.1f} {fts_rows:>9} {fts_ms:>10.1f}"
+                )
+        finally:
+            if not options['keep']:
+                self.stdout.write(f"Deleted {delete_bench_books()} synthetic books")
+                bump_catalog_version(rebuild=True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (median of repeats)"))
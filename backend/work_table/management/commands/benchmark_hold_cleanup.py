@@ -0,0 +1,86 @@
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from work_table.benchmarks import (
+    bench_books, bench_bookings, delete_bench_books, delete_bench_bookings, delete_bench_readers,
+    measure, reserve_bench_holds, seed_books, seed_bookings, seed_readers,
+)
+from work_table.catalog_cache import bump_catalog_version
+from work_table.counters import reconcile_counters
+from work_table.holds import HOLD_EXPIRY_DAYS, expired_holds_cutoff, release_expired_holds_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер снятия просроченных броней (цикл cleanup_expired_bookings) "
+        "на синтетических невыданных бронях (по умолчанию 1 000 000)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holds', type=int, default=1_000_000,
+                            help="Сколько просроченных синтетических броней вставить")
+        parser.add_argument('--books', type=int, default=10_000, help="Синтетических книг")
+        parser.add_argument('--per-reader', type=int, default=1000,
+                            help="Броней на одного синтетического читателя")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Сколько броней снимать за один проход, как в cleanup_expired_bookings")
+
+    def handle(self, *args, **options):
+        per_reader = options['per_reader']
+        if per_reader > options['books']:
+            raise CommandError("--per-reader must not exceed --books: (book, reader) pairs are unique")
+        if bench_bookings().exists():
+            raise CommandError("Synthetic bookings already exist, delete them before seeding holds")
+
+        try:
+            elapsed_ms, _, added = measure(lambda: seed_books(options['books']), repeat=1)
+            self.stdout.write(f"Seeded {added} books in {elapsed_ms / 1000:.1f} s")
+            elapsed_ms, _, added = measure(
+                lambda: seed_readers(math.ceil(options['holds'] / per_reader)), repeat=1
+            )
+            self.stdout.write(f"Seeded {added} readers in {elapsed_ms / 1000:.1f} s")
+            # Все брони старше срока хранения, поэтому каждая попадет под снятие
+            elapsed_ms, _, holds = measure(lambda: seed_bookings(
+                per_reader, issued=False, returned=False,
+                min_age_days=HOLD_EXPIRY_DAYS + 1, max_age_days=HOLD_EXPIRY_DAYS + 30,
+                progress=lambda inserted: self.stdout.write(f"  {inserted} holds", ending='\r'),
+            ), repeat=1)
+            reserve_bench_holds()
+            self.stdout.write(f"Seeded {holds} expired holds in {elapsed_ms / 1000:.1f} s")
+
+            # Снимаются только брони синтетических книг, настоящие остаются на месте
+            cutoff = expired_holds_cutoff()
+            book_ids = list(bench_books().values_list('id', flat=True))
+            released, chunks = 0, []
+            started = time.perf_counter()
+            while True:
+                chunk_started = time.perf_counter()
+                count, _ = release_expired_holds_chunk(cutoff, options['batch_size'], book_ids=book_ids)
+                if not count:
+                    break
+                chunks.append((time.perf_counter() - chunk_started) * 1000)
+                released += count
+            total = time.perf_counter() - started
+
+            self.stdout.write(
+                f"Released {released} holds in {total:.1f} s ({released / max(total, 1e-9):.0f} holds/s), "
+                f"{len(chunks)} chunks of {options['batch_size']}, "
+                f"median chunk {statistics.median(chunks) if chunks else 0:.1f} ms"
+            )
+            left = bench_bookings().count()
+            mismatched = bench_books().exclude(quantity_remaining=F('quantity_total')).count()
+            self.stdout.write(f"Holds left: {left}, books with unrestored inventory: {mismatched}")
+        finally:
+            self.stdout.write(
+                f"Deleted {delete_bench_bookings()} bookings, {delete_bench_readers()} readers, "
+                f"{delete_bench_books()} books"
+            )
+            # Снятие уменьшило счетчик бронирований, которые вставка мимо модели не увеличивала
+            reconcile_counters()
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
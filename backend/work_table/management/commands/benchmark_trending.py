@@ -0,0 +1,65 @@
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+
+from work_table.benchmarks import (
+    bench_bookings, delete_bench_books, delete_bench_bookings, delete_bench_readers,
+    measure, seed_books, seed_bookings, seed_readers,
+)
+from work_table.counters import reconcile_counters
+from work_table.trending import TRENDING_FETCH_SIZE, compute_trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер пересчета рейтинга trending (compute_trending) на синтетических "
+        "бронированиях (по умолчанию 10 000 000)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=10_000_000,
+                            help="Сколько синтетических бронирований вставить")
+        parser.add_argument('--books', type=int, default=20_000, help="Синтетических книг")
+        parser.add_argument('--per-reader', type=int, default=1000,
+                            help="Бронирований на одного синтетического читателя")
+        parser.add_argument('--repeat', type=int, default=3, help="Повторов пересчета")
+        parser.add_argument('--keep', action='store_true',
+                            help="Не удалять синтетические данные после замера")
+
+    def handle(self, *args, **options):
+        per_reader = options['per_reader']
+        if per_reader > options['books']:
+            raise CommandError("--per-reader must not exceed --books: (book, reader) pairs are unique")
+        readers = math.ceil(options['bookings'] / per_reader)
+
+        try:
+            elapsed_ms, _, added = measure(lambda: seed_books(options['books']), repeat=1)
+            self.stdout.write(f"Seeded {added} books in {elapsed_ms / 1000:.1f} s")
+            elapsed_ms, _, added = measure(lambda: seed_readers(readers), repeat=1)
+            self.stdout.write(f"Seeded {added} readers in {elapsed_ms / 1000:.1f} s")
+            # Бронирования, оставшиеся от запуска с --keep, используются повторно
+            added = bench_bookings().count()
+            if not added:
+                elapsed_ms, _, added = measure(lambda: seed_bookings(
+                    per_reader, max_age_days=365,
+                    progress=lambda inserted: self.stdout.write(f"  {inserted} bookings", ending='\r'),
+                ), repeat=1)
+                self.stdout.write(f"Seeded {added} bookings in {elapsed_ms / 1000:.1f} s")
+
+            median_ms, min_ms, ranking = measure(compute_trending, options['repeat'])
+            self.stdout.write(
+                f"compute_trending over {added} bookings (fetch size {TRENDING_FETCH_SIZE}): "
+                f"median {median_ms / 1000:.2f} s, min {min_ms / 1000:.2f} s, "
+                f"{added / (median_ms / 1000):.0f} bookings/s, {len(ranking)} books ranked"
+            )
+        finally:
+            if not options['keep']:
+                self.stdout.write(
+                    f"Deleted {delete_bench_bookings()} bookings, {delete_bench_readers()} readers, "
+                    f"{delete_bench_books()} books"
+                )
+                # Рейтинг в кэше и счетчики снова считаются только по настоящим данным
+                compute_trending()
+                reconcile_counters()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished"))
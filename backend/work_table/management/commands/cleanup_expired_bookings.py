@@ -1,24 +1,48 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from work_table.models import BookingCatalog
+from work_table.catalog_cache import bump_catalog_version
+from work_table.holds import (
+    HOLD_EXPIRY_DAYS, advisory_lock, expired_holds_cutoff,
+    expired_holds_summary, release_expired_holds_chunk,
+)
 
 
 class Command(BaseCommand):
-    help = "Удаляет брони, которые не были выданы и просрочены на 3 дня"
+    help = (
+        f"Удаляет брони, которые не были выданы и просрочены на {HOLD_EXPIRY_DAYS} дня, "
+        "и возвращает забронированные экземпляры в остаток"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Сколько броней удалять за один проход")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Только показать, сколько броней будет снято")
 
     def handle(self, *args, **options):
-        # Дата, которая была 3 дня назад
-        three_days_ago = timezone.now().date() - timedelta(days=3)
+        cutoff = expired_holds_cutoff()
+
+        if options['dry_run']:
+            summary = expired_holds_summary(cutoff)
+            self.stdout.write(
+                f"Would delete {summary['holds']} expired bookings "
+                f"({summary['copies'] or 0} copies)"
+            )
+            return
+
+        with advisory_lock() as acquired:
+            if not acquired:
+                self.stdout.write(self.style.WARNING("Another cleanup is running, skipping"))
+                return
 
-        # Находим брони, которые не были выданы и старше 3 дней
-        expired_bookings = BookingCatalog.objects.filter(
-            issued=False,
-            date_issue__lte=three_days_ago,
-        )
+            # Каждый проход - отдельная транзакция, блокировки держатся недолго
+            deleted = 0
+            while True:
+                count, _ = release_expired_holds_chunk(cutoff, options['batch_size'])
+                if not count:
+                    break
+                deleted += count
 
-        # Удаляем их (используем delete(), чтобы сработал переопределенный метод)
-        count = expired_bookings.count()
-        expired_bookings.delete()
+        if deleted:
+            bump_catalog_version()
 
-        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired bookings"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired bookings"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from work_table.trending import TRENDING_HALF_LIFE_DAYS, TRENDING_LIMIT, compute_trending
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рейтинг набирающих популярность книг (затухание по возрасту бронирования)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=TRENDING_LIMIT)
+        parser.add_argument('--half-life', type=float, default=TRENDING_HALF_LIFE_DAYS,
+                            help="Период полураспада веса бронирования, в днях")
+
+    def handle(self, *args, **options):
+        ranking = compute_trending(limit=options['limit'], half_life_days=options['half_life'])
+
+        self.stdout.write(self.style.SUCCESS(f"Trending books computed: {len(ranking)} books"))
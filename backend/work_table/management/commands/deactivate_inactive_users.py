@@ -3,6 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Q  # Добавьте этот импорт
 from work_table.models import ReadersCatalog
+from work_table.authentication import revoke_reader_tokens
 
 
 class Command(BaseCommand):
@@ -21,7 +22,11 @@ class Command(BaseCommand):
         # Находим пользователей, удовлетворяющих любому из условий
         inactive_users = ReadersCatalog.objects.filter(condition1 | condition2, is_active=True)
 
-        count = inactive_users.count()
+        user_ids = list(inactive_users.values_list('id', flat=True))
+        count = len(user_ids)
         inactive_users.update(is_active=False)
 
+        # Выданные токены содержат is_active=True, отзываем их
+        revoke_reader_tokens(*user_ids)
+
         self.stdout.write(self.style.SUCCESS(f'Deactivated {count} users'))
\ No newline at end of file
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from work_table.debtors import rebuild_debtors
+
+
+class Command(BaseCommand):
+    help = "Пересобирает кэш сроков возврата читателей (список должников) по таблице бронирований"
+
+    def handle(self, *args, **options):
+        count = rebuild_debtors()
+
+        self.stdout.write(self.style.SUCCESS(f"Debtor index rebuilt: {count} readers with books on hand"))
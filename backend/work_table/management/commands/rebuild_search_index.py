@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from work_table.search import update_search_vector
+from work_table.catalog_cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает полнотекстовый индекс (search_vector) всех книг"
+
+    def handle(self, *args, **options):
+        count = update_search_vector()
+        bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {count} books"))
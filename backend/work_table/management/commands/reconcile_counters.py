@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from work_table.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Сверяет счетчики статистики (книги, читатели, заказы, бронирования) с таблицами"
+
+    def handle(self, *args, **options):
+        counters = reconcile_counters()
+
+        summary = ', '.join(f"{field}={value}" for field, value in counters.items())
+        self.stdout.write(self.style.SUCCESS(f"Counters reconciled: {summary}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from work_table.popularity import reconcile
+
+
+class Command(BaseCommand):
+    help = "Сверяет рейтинг популярных книг в Redis с таблицей бронирований"
+
+    def handle(self, *args, **options):
+        count = reconcile()
+
+        self.stdout.write(self.style.SUCCESS(f"Popular books leaderboard rebuilt: {count} books"))
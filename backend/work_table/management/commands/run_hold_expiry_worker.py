@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from work_table.catalog_cache import bump_catalog_version
+from work_table.holds import process_due_holds, schedule_pending_holds
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер, снимающий истекшие невыданные брони по Redis ZSET сроков "
+        "(cleanup_expired_bookings остается страховочной проверкой)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Пауза между проверками, в секундах")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        scheduled = schedule_pending_holds()
+        self.stdout.write(f"Scheduled {scheduled} pending bookings")
+
+        try:
+            while True:
+                try:
+                    released, book_ids = process_due_holds(options['batch_size'])
+                except Exception as e:
+                    logger.error(f"Hold expiry worker failed: {e}")
+                    time.sleep(options['interval'])
+                    continue
+
+                if released:
+                    bump_catalog_version()
+                    self.stdout.write(f"Released {released} expired bookings ({len(book_ids)} books)")
+
+                # Пока есть полная пачка, продолжаем без паузы
+                if released < options['batch_size']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS("Hold expiry worker stopped"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from work_table.reports import run_worker
+
+
+class Command(BaseCommand):
+    help = "Воркер, строящий отчеты из очереди ReportJob в MEDIA_ROOT/reports/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Пауза при пустой очереди, в секундах")
+        parser.add_argument('--once', action='store_true',
+                            help="Выполнить накопившиеся задачи и завершиться")
+
+    def handle(self, *args, **options):
+        try:
+            run_worker(interval=options['interval'], once=options['once'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("Report worker stopped"))
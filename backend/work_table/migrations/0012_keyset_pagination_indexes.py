@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0011_alter_ordercatalog_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookscatalog',
+            index=models.Index(fields=['title', 'id'], name='books_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookscatalog',
+            index=models.Index(fields=['date_publication', 'id'], name='books_date_pub_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookscatalog',
+            index=models.Index(fields=['quantity_remaining', 'id'], name='books_qty_remaining_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingcatalog',
+            index=models.Index(fields=['date_issue', 'id'], name='booking_date_issue_id_idx'),
+        ),
+    ]
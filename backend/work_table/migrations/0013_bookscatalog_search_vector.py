@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Должно совпадать с work_table.search.book_search_vector
+BACKFILL_SEARCH_VECTOR = """
+UPDATE "Books_catalog" b SET search_vector =
+    setweight(to_tsvector('russian', coalesce(b.title, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce((
+        SELECT string_agg(concat_ws(' ', a.author_surname, a.author_name, a.author_patronymic), ' ')
+        FROM "Authors_Books" ab JOIN "Authors_catalog" a ON a.id = ab.author_id
+        WHERE ab.book_id = b.id
+    ), '') || ' ' || coalesce(b.authors_mark, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce((
+        SELECT string_agg(g.name, ' ')
+        FROM "Books_Genres" bg JOIN "Genres_catalog" g ON g.id = bg.genre_id
+        WHERE bg.book_id = b.id
+    ), '')), 'C')
+    || setweight(to_tsvector('russian',
+        coalesce(b.place_publication, '') || ' ' || coalesce(b.information_publication, '')), 'D');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0012_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookscatalog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bookscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='books_search_vector_gin'),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0013_bookscatalog_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['author_surname'], name='authors_surname_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['author_name'], name='authors_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['author_patronymic'], name='authors_patronymic_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
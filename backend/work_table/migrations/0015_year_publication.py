@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+# Должно совпадать с work_table.models.parse_year
+BACKFILL_YEAR = """
+UPDATE "Books_catalog"
+SET year_publication = substring(date_publication from '\\d{4}')::smallint
+WHERE date_publication ~ '\\d{4}';
+
+UPDATE "Order_catalog"
+SET year_publication = substring(date_publication from '\\d{4}')::smallint
+WHERE date_publication ~ '\\d{4}';
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0014_authors_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookscatalog',
+            name='year_publication',
+            field=models.SmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ordercatalog',
+            name='year_publication',
+            field=models.SmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='bookscatalog',
+            name='books_date_pub_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bookscatalog',
+            index=models.Index(fields=['year_publication', 'id'], name='books_year_pub_id_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_YEAR, migrations.RunSQL.noop),
+    ]
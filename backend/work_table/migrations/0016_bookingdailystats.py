@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0015_year_publication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.IntegerField(default=0)),
+                ('issues', models.IntegerField(default=0)),
+                ('returns', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='work_table.bookscatalog')),
+            ],
+            options={
+                'db_table': 'Booking_daily_stats',
+                'managed': True,
+                'indexes': [models.Index(fields=['day', 'book'], name='booking_stats_day_book_idx')],
+                'unique_together': {('book', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0016_bookingdailystats'),
+    ]
+
+    operations = [
+        # Остатки, уже ушедшие в минус из-за гонок, иначе не дадут добавить ограничение
+        migrations.RunSQL(
+            'UPDATE "Books_catalog" SET quantity_remaining = 0 WHERE quantity_remaining < 0;',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='bookscatalog',
+            constraint=models.CheckConstraint(
+                condition=models.Q(('quantity_remaining__gte', 0)),
+                name='books_qty_remaining_non_negative',
+            ),
+        ),
+    ]
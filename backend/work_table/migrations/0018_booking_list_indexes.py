@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0017_books_qty_remaining_check'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingcatalog',
+            index=models.Index(fields=['reader', 'returned'], name='booking_reader_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingcatalog',
+            index=models.Index(fields=['issued', 'returned', 'date_return'], name='booking_status_return_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0018_booking_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingcatalog',
+            index=models.Index(
+                condition=models.Q(('issued', True), ('returned', False)),
+                fields=['date_return', 'reader'],
+                name='booking_debtors_idx',
+            ),
+        ),
+    ]
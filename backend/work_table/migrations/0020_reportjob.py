@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0019_booking_debtors_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Строится'), ('done', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=16)),
+                ('file', models.FileField(blank=True, null=True, upload_to='reports/')),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='work_table.readerscatalog')),
+            ],
+            options={
+                'db_table': 'Report_jobs',
+                'managed': True,
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='report_jobs_pending_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('start_date', 'end_date'), name='report_jobs_active_period_uniq')],
+            },
+        ),
+    ]
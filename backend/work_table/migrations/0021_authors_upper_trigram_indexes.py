@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_table', '0020_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('author_surname'), name='gin_trgm_ops'), name='authors_surname_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('author_name'), name='gin_trgm_ops'), name='authors_name_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='authorscatalog',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('author_patronymic'), name='gin_trgm_ops'), name='authors_patronymic_upper_trgm'),
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
+import re
+
+
+def parse_year(value):
+    """Год из текстового поля даты публикации (первые четыре цифры подряд)"""
+    match = re.search(r'\d{4}', value or '')
+    return int(match.group()) if match else None
 
 class AuthorsBooks(models.Model):
     id = models.AutoField(primary_key=True)
@@ -25,6 +35,17 @@ class AuthorsCatalog(models.Model):
     class Meta:
         managed = True
         db_table = 'Authors_catalog'
+        # pg_trgm для BookFilter: trigram_similar сравнивает столбец как есть,
+        # а icontains в PostgreSQL - это UPPER(столбец) LIKE UPPER(...),
+        # поэтому для него нужны индексы по выражению Upper
+        indexes = [
+            GinIndex(fields=['author_surname'], name='authors_surname_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['author_name'], name='authors_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['author_patronymic'], name='authors_patronymic_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(OpClass(Upper('author_surname'), name='gin_trgm_ops'), name='authors_surname_upper_trgm'),
+            GinIndex(OpClass(Upper('author_name'), name='gin_trgm_ops'), name='authors_name_upper_trgm'),
+            GinIndex(OpClass(Upper('author_patronymic'), name='gin_trgm_ops'), name='authors_patronymic_upper_trgm'),
+        ]
 
 class BookingCatalog(models.Model):
     index = models.ForeignKey('BooksCatalog', models.PROTECT)
@@ -36,53 +57,177 @@ class BookingCatalog(models.Model):
     issued = models.BooleanField(default=False)
     returned = models.BooleanField(default=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Запоминаем загруженные значения, чтобы определять изменения без SELECT
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
+    def get_previous_state(self):
+        """Значения полей (по attname) на момент загрузки из БД или None для новой записи"""
+        if not self.pk:
+            return None
+        loaded = getattr(self, '_loaded_values', None) or {}
+        # Объект собран вручную с pk или загружен с only()/defer() -
+        # недостающие значения можно узнать только из БД
+        missing = [
+            field.attname for field in self._meta.concrete_fields
+            if field.attname not in loaded
+        ]
+        if missing:
+            stored = BookingCatalog.objects.filter(pk=self.pk).values(*missing).first()
+            if stored is None:
+                return loaded or None
+            loaded = {**loaded, **stored}
+        return loaded
+
+    def get_dirty_fields(self, previous):
+        """
+        Имена полей, значения которых изменились после загрузки.
+        Отложенные поля, которым не присваивали значение, не изменились;
+        поля без прежнего значения считаются измененными
+        """
+        deferred = self.get_deferred_fields()
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname not in deferred
+            and (field.attname not in previous
+                 or getattr(self, field.attname) != previous[field.attname])
+        ]
+
     def save(self, *args, **kwargs):
-        # Получаем текущее состояние из базы, если запись уже существует
-        if self.pk:
-            old_booking = BookingCatalog.objects.get(pk=self.pk)
-        else:
-            old_booking = None
+        previous = self.get_previous_state()
 
         # Для новых записей устанавливаем даты по умолчанию
-        if not self.pk:
+        if previous is None:
             if not self.date_issue:
                 self.date_issue = timezone.now().date()
             if not self.date_return:
                 self.date_return = self.date_issue + timedelta(days=30)
 
             existing_booking = BookingCatalog.objects.filter(
-                index=self.index,
-                reader=self.reader
+                index_id=self.index_id,
+                reader_id=self.reader_id
             ).exists()
 
             if existing_booking:
                 raise ValueError("У пользователя уже есть бронирование для этой книги")
-            # При создании новой записи сразу вычитаем количество
-            if self.index.quantity_remaining < self.quantity:
-                raise ValueError("Недостаточно экземпляров книги для бронирования")
-            self.index.quantity_remaining -= self.quantity
-            self.index.save()
-
-        # Обрабатываем возврат книг (только при изменении returned с False на True)
-        if self.returned and (old_booking and not old_booking.returned):
-            if not self.issued:
-                raise ValueError("Невозможно вернуть невыданные книги")
-            self.index.quantity_remaining += self.quantity
-            self.index.save()
+        elif 'update_fields' not in kwargs and not args:
+            # Обновляем только изменившиеся столбцы; без изменений UPDATE не выполняется
+            kwargs['update_fields'] = self.get_dirty_fields(previous)
 
-        super().save(*args, **kwargs)
+        was_issued = bool(previous and previous.get('issued'))
+        was_returned = bool(previous and previous.get('returned'))
+
+        with transaction.atomic():
+            # При создании новой записи сразу вычитаем количество
+            if previous is None:
+                if not BooksCatalog.change_remaining(self.index_id, -self.quantity):
+                    raise ValueError("Недостаточно экземпляров книги для бронирования")
+
+            # Обрабатываем возврат книг (только при изменении returned с False на True)
+            if self.returned and previous is not None and not was_returned:
+                if not self.issued:
+                    raise ValueError("Невозможно вернуть невыданные книги")
+                # Книга блокируется раньше бронирования, как и в booking_actions
+                BooksCatalog.lock_rows(self.index_id)
+                # Снимок _loaded_values мог устареть: из параллельных возвратов
+                # остаток восстанавливает только тот, чей UPDATE изменил строку
+                if BookingCatalog.objects.filter(pk=self.pk, returned=False).update(returned=True) == 1:
+                    BooksCatalog.change_remaining(self.index_id, self.quantity)
+                else:
+                    was_returned = True
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = [
+                        name for name in kwargs['update_fields'] if name != 'returned'
+                    ]
+
+            super().save(*args, **kwargs)
+
+        # Отложенные поля не читаем: их значения уже есть в previous
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            **(previous or {}),
+            **{
+                field.attname: getattr(self, field.attname)
+                for field in self._meta.concrete_fields if field.attname not in deferred
+            },
+        }
+
+        # Счетчик популярности меняется только при переходе issued
+        from .popularity import record_issued_delta
+        record_issued_delta(self.index_id, int(self.issued) - int(was_issued))
+
+        # Счетчик невозвращенных бронирований для статистики
+        from .counters import adjust_counters
+        if previous is None:
+            adjust_counters(bookings=int(not self.returned))
+        else:
+            adjust_counters(bookings=int(was_returned) - int(self.returned))
+
+        # Список должников зависит от выданных и невозвращенных книг читателя
+        from .debtors import refresh_readers
+        if previous is not None and (
+                self.issued != was_issued or self.returned != was_returned
+                or previous.get('date_return') != self.date_return):
+            refresh_readers(self.reader_id)
+
+        # Срок невыданной брони отслеживает воркер run_hold_expiry_worker
+        from .holds import schedule_holds, unschedule_holds
+        if previous is None and not self.issued:
+            schedule_holds([(self.pk, self.date_issue)])
+        elif self.issued and not was_issued:
+            unschedule_holds([self.pk])
+        elif not self.issued and (was_issued or previous.get('date_issue') != self.date_issue):
+            schedule_holds([(self.pk, self.date_issue)])
+
+        # События за день для популярности по окну (BookingDailyStats)
+        events = {}
+        if previous is None:
+            events['bookings'] = 1
+        if self.issued and not was_issued:
+            events['issues'] = 1
+        if self.returned and not was_returned:
+            events['returns'] = 1
+        if events:
+            BookingDailyStats.record(self.index_id, **events)
 
     def delete(self, *args, **kwargs):
         # Проверяем условия перед удалением
         if self.issued and not self.returned:
             raise ValueError("Невозможно удалить выданную и невозвращенную книгу")
 
-        # Если запись не выдана, возвращаем количество
-        if not self.issued:
-            self.index.quantity_remaining += self.quantity
-            self.index.save()
-
-        super().delete(*args, **kwargs)
+        booking_id, book_id, was_issued = self.pk, self.index_id, self.issued
+        # Условие повторяет проверку выше, но уже по строке в БД
+        condition = models.Q(returned=True) if was_issued else models.Q(issued=False)
+        with transaction.atomic():
+            if not was_issued:
+                BooksCatalog.lock_rows(book_id)
+            # Бронь могли удалить параллельно (или снять воркером броней) либо успеть выдать:
+            # количество возвращается, только если удалена именно эта строка
+            result = BookingCatalog.objects.filter(condition, pk=booking_id).delete()
+            if result[0] != 1:
+                if BookingCatalog.objects.filter(pk=booking_id).exists():
+                    raise ValueError("Бронирование изменилось, обновите данные")
+                return result
+            # Если запись не выдана, возвращаем количество
+            if not was_issued:
+                BooksCatalog.change_remaining(book_id, self.quantity)
+        self.pk = None
+
+        from .popularity import record_issued_delta
+        from .holds import unschedule_holds
+        from .counters import adjust_counters
+        record_issued_delta(book_id, -int(was_issued))
+        adjust_counters(bookings=-int(not self.returned))
+        if not was_issued:
+            unschedule_holds([booking_id])
+        return result
 
     def mark_as_returned(self):
         if not self.issued:
@@ -98,11 +243,46 @@ class BookingCatalog(models.Model):
         managed = True
         db_table = 'Booking_catalog'
         unique_together = [('index', 'reader')]
+        indexes = [
+            models.Index(fields=['date_issue', 'id'], name='booking_date_issue_id_idx'),
+            # Списки бронирований читателя и фильтры по статусу
+            models.Index(fields=['reader', 'returned'], name='booking_reader_returned_idx'),
+            models.Index(fields=['issued', 'returned', 'date_return'], name='booking_status_return_idx'),
+            # Только книги на руках - для поиска должников
+            models.Index(
+                fields=['date_return', 'reader'], name='booking_debtors_idx',
+                condition=models.Q(issued=True, returned=False),
+            ),
+        ]
+
+class BookingDailyStats(models.Model):
+    """
+    Дневная сводка событий бронирования по книге.
+    Заполняется из BookingCatalog.save и командой backfill_booking_stats
+    """
+    book = models.ForeignKey('BooksCatalog', models.CASCADE)
+    day = models.DateField()
+    bookings = models.IntegerField(default=0)
+    issues = models.IntegerField(default=0)
+    returns = models.IntegerField(default=0)
 
-@receiver([post_save, post_delete], sender=BookingCatalog)
-def invalidate_popular_books_cache(sender, instance, **kwargs):
-    cache_key = 'popular_books_top10_issued'
-    cache.delete(cache_key)  # Удаляем кэш при изменении бронирования
+    class Meta:
+        managed = True
+        db_table = 'Booking_daily_stats'
+        unique_together = [('book', 'day')]
+        indexes = [
+            models.Index(fields=['day', 'book'], name='booking_stats_day_book_idx'),
+        ]
+
+    @classmethod
+    def record(cls, book_id, day=None, **counters):
+        """Атомарно прибавляет счетчики к строке (книга, день)"""
+        day = day or timezone.now().date()
+        stats, created = cls.objects.get_or_create(book_id=book_id, day=day, defaults=counters)
+        if not created:
+            cls.objects.filter(pk=stats.pk).update(
+                **{field: F(field) + value for field, value in counters.items()}
+            )
 
 class BooksCatalog(models.Model):
     id = models.AutoField(primary_key=True)  # Автоматический числовой первичный ключ
@@ -116,20 +296,81 @@ class BooksCatalog(models.Model):
     quantity_remaining = models.IntegerField()
     cover = models.ImageField(upload_to='covers/', blank=True, null=True)
     date_publication = models.TextField()
+    # Числовой год из date_publication для фильтрации и сортировки по индексу
+    year_publication = models.SmallIntegerField(blank=True, null=True, editable=False)
     genres = models.ManyToManyField(
         'GenresCatalog',
         through='BooksGenres',
         related_name='books'
     )
+    # Поддерживается work_table.search.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         db_table = 'Books_catalog'
         managed = True
+        # Индексы для keyset-пагинации по поддерживаемым сортировкам
+        indexes = [
+            models.Index(fields=['title', 'id'], name='books_title_id_idx'),
+            models.Index(fields=['year_publication', 'id'], name='books_year_pub_id_idx'),
+            models.Index(fields=['quantity_remaining', 'id'], name='books_qty_remaining_id_idx'),
+            GinIndex(fields=['search_vector'], name='books_search_vector_gin'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(quantity_remaining__gte=0),
+                name='books_qty_remaining_non_negative',
+            ),
+        ]
+
+    @classmethod
+    def change_remaining(cls, book_id, delta, bump_cache=True):
+        """
+        Изменяет quantity_remaining одним условным UPDATE без чтения строки:
+        списание проходит, только если экземпляров хватает, поэтому
+        параллельные брони не могут уйти в минус. Возвращает True при успехе.
+        Кэш каталога сбрасывается после фиксации, только если остаток изменился;
+        пакетные операции передают bump_cache=False и сбрасывают его один раз
+        """
+        changed = cls.objects.filter(
+            pk=book_id, quantity_remaining__gte=max(-delta, 0)
+        ).update(quantity_remaining=F('quantity_remaining') + delta) == 1
+        if changed:
+            from .live import publish_availability
+            publish_availability(book_id, delta)
+            if bump_cache and delta:
+                from .catalog_cache import bump_catalog_version
+                transaction.on_commit(bump_catalog_version)
+        return changed
+
+    @classmethod
+    def lock_rows(cls, *book_ids):
+        """
+        Блокирует строки книг (SELECT ... FOR UPDATE) в порядке id.
+        Книги всегда блокируются раньше бронирований, чтобы одиночные
+        и пакетные операции не взаимоблокировались
+        """
+        return list(
+            cls.objects.select_for_update().filter(id__in=book_ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def save(self, *args, **kwargs):
+        self.year_publication = parse_year(self.date_publication)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date_publication' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'year_publication'}
+        super().save(*args, **kwargs)
 
     @property
     def authors_list(self):
         if not hasattr(self, '_cached_authors'):
-            self._cached_authors = list(self.authors())
+            # Используем prefetch_related('authorsbooks_set__author'), если он был
+            prefetched = getattr(self, '_prefetched_objects_cache', {})
+            if 'authorsbooks_set' in prefetched:
+                self._cached_authors = [link.author for link in self.authorsbooks_set.all()]
+            else:
+                self._cached_authors = list(self.authors())
         return self._cached_authors
 
     def get_authors_names(self):
@@ -172,6 +413,7 @@ class OrderCatalog(models.Model):
     quantyti = models.IntegerField()
     reader = models.ForeignKey('ReadersCatalog', models.CASCADE)
     date_publication = models.TextField(blank=True, null=True)
+    year_publication = models.SmallIntegerField(blank=True, null=True, editable=False, db_index=True)
     confirmed = models.BooleanField(default=False)
 
     class Meta:
@@ -179,6 +421,36 @@ class OrderCatalog(models.Model):
         db_table = 'Order_catalog'
         unique_together = [('title', 'reader')]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Для счетчика неподтвержденных заказов
+        instance._loaded_confirmed = instance.__dict__.get('confirmed')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.year_publication = parse_year(self.date_publication)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date_publication' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'year_publication'}
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        from .counters import adjust_counters
+        if adding:
+            adjust_counters(orders=int(not self.confirmed))
+        else:
+            was_confirmed = getattr(self, '_loaded_confirmed', None)
+            if was_confirmed is not None:
+                adjust_counters(orders=int(was_confirmed) - int(self.confirmed))
+        self._loaded_confirmed = self.confirmed
+
+@receiver(post_delete, sender=OrderCatalog)
+def count_deleted_order(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении вместе с читателем
+    from .counters import adjust_counters
+    adjust_counters(orders=-int(not instance.confirmed))
+
 
 class ReadersCatalog(models.Model):
     is_active = models.BooleanField(default=True)
@@ -212,6 +484,30 @@ class ReadersCatalog(models.Model):
         db_table = 'Readers_catalog'
         unique_together = [('passport_series', 'passport_number')]
 
+    # Читатель используется как request.user в DRF
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+@receiver([post_save, post_delete], sender=ReadersCatalog)
+def invalidate_reader_identity_cache(sender, instance, **kwargs):
+    from .authentication import invalidate_reader_identity
+    invalidate_reader_identity(instance.id)
+
+@receiver([post_save, post_delete], sender=BooksCatalog)
+@receiver([post_save, post_delete], sender=ReadersCatalog)
+def count_books_and_readers(sender, instance, signal, created=False, **kwargs):
+    from .counters import adjust_counters
+    field = 'books' if sender is BooksCatalog else 'users'
+    if signal is post_delete:
+        adjust_counters(**{field: -1})
+    elif created:
+        adjust_counters(**{field: 1})
+
 
 class GenresCatalog(models.Model):
     id = models.AutoField(primary_key=True)
@@ -233,4 +529,47 @@ class BooksGenres(models.Model):
     class Meta:
         managed = True
         db_table = 'Books_Genres'
-        unique_together = (('book', 'genre'),)
\ No newline at end of file
+        unique_together = (('book', 'genre'),)
+
+class ReportJob(models.Model):
+    """Задача на построение отчета; очередь - сама таблица (см. work_table.reports)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Строится'),
+        (STATUS_DONE, 'Готов'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    id = models.AutoField(primary_key=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(upload_to='reports/', blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey('ReadersCatalog', models.SET_NULL, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = 'Report_jobs'
+        constraints = [
+            # Одинаковый отчет не ставится в очередь дважды, пока предыдущий не готов
+            models.UniqueConstraint(
+                fields=['start_date', 'end_date'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='report_jobs_active_period_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['id'], name='report_jobs_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
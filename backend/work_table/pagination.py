@@ -0,0 +1,174 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset): следующая страница выбирается условием
+    "(поле, id) после (последнее значение, последний id)" с границей
+    по полю для диапазона индекса (см. get_position_filters), без OFFSET.
+    Сортировка берется из queryset (OrderingFilter или Meta.ordering),
+    id всегда добавляется вторым ключом для однозначного порядка.
+    COUNT(*) выполняется только по запросу ?count=true.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor.get('r'))
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+
+        # Для предыдущей страницы идем в обратную сторону и затем переворачиваем
+        descending = self.descending != self.reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        # Участки после курсора читаются по очереди, пока не наберется страница
+        segments = self.get_position_filters(queryset, cursor, descending) if cursor else [Q()]
+        limit = self.page_size + 1
+        results = []
+        for condition in segments:
+            results += queryset.filter(condition)[:limit - len(results)]
+            if len(results) >= limit:
+                break
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_position_filters(self, queryset, cursor, descending):
+        """
+        Условия "строго после курсора" для порядка (field, id) - список участков
+        в порядке выдачи. Внутри участка условие содержит границу field >= v
+        (<= при DESC), с которой PostgreSQL начинает диапазон индекса (field, id),
+        поэтому глубокие страницы не дороже первых. NULL-значения - отдельный
+        участок: PostgreSQL сортирует их в конце при ASC и в начале при DESC.
+        """
+        field, value, pk = self.field, cursor['v'], cursor['id']
+        lookup = 'lt' if descending else 'gt'
+        after_pk = Q(**{f'id__{lookup}': pk})
+
+        if value is None:
+            segments = [Q(**{f'{field}__isnull': True}) & after_pk]
+            if descending:
+                segments.append(Q(**{f'{field}__isnull': False}))
+            return segments
+
+        bound = Q(**{f'{field}__{lookup}e': value})
+        segments = [bound & (Q(**{f'{field}__{lookup}': value}) | (Q(**{field: value}) & after_pk))]
+        if not descending and self.is_nullable(queryset.model, field):
+            segments.append(Q(**{f'{field}__isnull': True}))
+        return segments
+
+    @staticmethod
+    def is_nullable(model, field):
+        try:
+            return model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            return False
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        first = ordering[0] if ordering and isinstance(ordering[0], str) else 'id'
+        return first.lstrip('-'), first.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            cursor['v'], cursor['id']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field)
+        if value is not None and not isinstance(value, (int, float, str)):
+            value = str(value)
+        cursor = {'v': value, 'id': obj.id}
+        if reverse:
+            cursor['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, '')
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class BookPagination(PageNumberPagination):
+    """
+    Постраничная пагинация. Если в запросе есть параметр cursor
+    (для первой страницы - пустой), используется KeysetPagination.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
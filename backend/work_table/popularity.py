@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.db import transaction
+from datetime import timedelta
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import BookingCatalog, BookingDailyStats
+
+# ZSET: book_id -> количество выданных бронирований книги
+POPULAR_BOOKS_KEY = 'popular_books_issued'
+
+# Окна для ?window= у популярных книг, в днях
+POPULARITY_WINDOWS = {'7d': 7, '30d': 30, '365d': 365}
+
+# Элемент ZSET, отмечающий, что рейтинг построен reconcile (как в debtors.py)
+BUILT_MEMBER = 'built'
+
+# Счетчик меняется, только если рейтинг построен: иначе ZINCRBY создал бы
+# ZSET из одной книги, и top_books отдавал бы его до следующей сверки
+INCR_IF_BUILT_LUA = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return redis.call('ZINCRBY', KEYS[1], ARGV[2], ARGV[3])
+end
+return false
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _key():
+    return cache.make_key(POPULAR_BOOKS_KEY)
+
+
+def record_issued_delta(book_id, delta):
+    """Изменяет счетчик книги после фиксации транзакции"""
+    if not delta:
+        return
+
+    def apply():
+        _redis().register_script(INCR_IF_BUILT_LUA)(keys=[_key()], args=[BUILT_MEMBER, delta, book_id])
+
+    transaction.on_commit(apply)
+
+
+def top_books(limit=10):
+    """[(book_id, количество выдач)] по убыванию популярности"""
+    redis = _redis()
+    if redis.zscore(_key(), BUILT_MEMBER) is None:
+        reconcile()
+    # Отметка BUILT_MEMBER имеет счет -inf и отсекается условием score > 0
+    return [
+        (int(book_id), int(score))
+        for book_id, score in redis.zrevrange(_key(), 0, limit - 1, withscores=True)
+        if score > 0
+    ]
+
+
+def window_top_books(days, limit=10):
+    """
+    [(book_id, количество выдач)] за последние days дней по дневной сводке:
+    суммируется не больше days строк на книгу
+    """
+    since = timezone.now().date() - timedelta(days=days - 1)
+    return list(
+        BookingDailyStats.objects.filter(day__gte=since)
+        .values('book_id')
+        .annotate(total=Sum('issues'))
+        .filter(total__gt=0)
+        .order_by('-total', 'book_id')
+        .values_list('book_id', 'total')[:limit]
+    )
+
+
+def reconcile():
+    """
+    Пересобирает ZSET из BookingCatalog одним агрегирующим запросом
+    и атомарно подменяет им текущий (RENAME). ZSET всегда содержит BUILT_MEMBER
+    """
+    counts = BookingCatalog.objects.filter(issued=True).values('index_id').annotate(
+        issued_count=Count('id')
+    ).values_list('index_id', 'issued_count')
+    mapping = {book_id: issued_count for book_id, issued_count in counts}
+
+    redis = _redis()
+    tmp_key = f'{_key()}:rebuild'
+    pipe = redis.pipeline()
+    pipe.delete(tmp_key)
+    if mapping:
+        pipe.zadd(tmp_key, mapping)
+    # Пустой ZSET в Redis не хранится, поэтому отмечаем, что рейтинг построен
+    pipe.zadd(tmp_key, {BUILT_MEMBER: float('-inf')})
+    pipe.rename(tmp_key, _key())
+    pipe.execute()
+    return len(mapping)
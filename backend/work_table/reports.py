@@ -0,0 +1,200 @@
+import logging
+import os
+import time
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+
+from .models import AuthorsBooks, BookingCatalog, ReportJob
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = 'reports'
+# Задача, которая строится дольше, считается брошенной (воркер упал)
+STALE_JOB_TIMEOUT = timedelta(hours=1)
+
+
+def write_report(path, start_date, end_date):
+    """
+    Строит xlsx-отчет за период [start_date, end_date) в файл path:
+    книги у читателей, популярные книги, авторы и жанры
+    """
+    writer = pd.ExcelWriter(path, engine='xlsxwriter')
+
+    # 1. Книги у читателей (issued = True и returned = False)
+    issued_books = BookingCatalog.objects.filter(
+        issued=True,
+        returned=False,
+        date_issue__gte=start_date,
+        date_issue__lt=end_date
+    ).select_related('index', 'reader').prefetch_related(
+        Prefetch('index__authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author'))
+    )
+
+    issued_data = []
+    for booking in issued_books:
+        issued_data.append({
+            'Название книги': booking.index.title,
+            'Автор(ы)': booking.index.get_authors_names(),
+            'Читатель': f"{booking.reader.surname} {booking.reader.name}",
+            'Дата выдачи': booking.date_issue,
+            'Дата возврата': booking.date_return,
+            'Количество': booking.quantity,
+            'Статус': 'На руках'
+        })
+
+    if issued_data:
+        df_issued = pd.DataFrame(issued_data)
+        df_issued.to_excel(writer, sheet_name='Книги у читателей', index=False)
+
+    # 2. Популярные книги (10 самых бронированных)
+    popular_books = BookingCatalog.objects.filter(
+        date_issue__gte=start_date,
+        date_issue__lt=end_date
+    ).values(
+        'index__title',
+        'index__authors_mark'
+    ).annotate(
+        total_bookings=Count('id')
+    ).order_by('-total_bookings')[:10]
+
+    popular_books_data = []
+    for book in popular_books:
+        popular_books_data.append({
+            'Название книги': book['index__title'],
+            'Автор(ы)': book['index__authors_mark'],
+            'Количество бронирований': book['total_bookings']
+        })
+
+    if popular_books_data:
+        df_popular = pd.DataFrame(popular_books_data)
+        df_popular.to_excel(writer, sheet_name='Популярные книги', index=False)
+
+    # 3. Популярные авторы (10 самых бронированных)
+    popular_authors = BookingCatalog.objects.filter(
+        date_issue__gte=start_date,
+        date_issue__lt=end_date
+    ).values(
+        'index__authorsbooks__author__author_surname',
+        'index__authorsbooks__author__author_name'
+    ).annotate(
+        total_bookings=Count('id')
+    ).order_by('-total_bookings')[:10]
+
+    authors_data = []
+    for author in popular_authors:
+        authors_data.append({
+            'Фамилия автора': author['index__authorsbooks__author__author_surname'],
+            'Имя автора': author['index__authorsbooks__author__author_name'],
+            'Количество бронирований': author['total_bookings']
+        })
+
+    if authors_data:
+        df_authors = pd.DataFrame(authors_data)
+        df_authors.to_excel(writer, sheet_name='Популярные авторы', index=False)
+
+    # 4. Популярные жанры (10 самых бронированных)
+    popular_genres = BookingCatalog.objects.filter(
+        date_issue__gte=start_date,
+        date_issue__lt=end_date
+    ).values(
+        'index__booksgenres__genre__name'
+    ).annotate(
+        total_bookings=Count('id')
+    ).order_by('-total_bookings')[:10]
+
+    genres_data = []
+    for genre in popular_genres:
+        genres_data.append({
+            'Жанр': genre['index__booksgenres__genre__name'],
+            'Количество бронирований': genre['total_bookings']
+        })
+
+    if genres_data:
+        df_genres = pd.DataFrame(genres_data)
+        df_genres.to_excel(writer, sheet_name='Популярные жанры', index=False)
+
+    writer.close()
+
+
+def enqueue_report(start_date, end_date, user=None):
+    """
+    Ставит отчет в очередь. Если такой же отчет уже ждет или строится,
+    возвращается существующая задача. Возвращает (задача, создана ли новая)
+    """
+    active = ReportJob.objects.filter(
+        start_date=start_date, end_date=end_date, status__in=ReportJob.ACTIVE_STATUSES
+    )
+    job = active.first()
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            return ReportJob.objects.create(
+                start_date=start_date, end_date=end_date, created_by=user
+            ), True
+    except IntegrityError:
+        # Параллельный запрос успел создать задачу (частичный уникальный индекс)
+        return active.get(), False
+
+
+def claim_next_job():
+    """Забирает самую старую задачу из очереди; SKIP LOCKED позволяет запускать несколько воркеров"""
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+            status=ReportJob.STATUS_PENDING
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.status = ReportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_job(job):
+    filename = f'library_report_{job.start_date}_{job.end_date}_{job.id}.xlsx'
+    relative_path = os.path.join(REPORTS_DIR, filename)
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    try:
+        # Чтобы включить весь день окончания
+        write_report(full_path, job.start_date, job.end_date + timedelta(days=1))
+    except Exception as e:
+        logger.error(f"Ошибка при построении отчета {job.id}: {e}")
+        job.status = ReportJob.STATUS_FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.file.name = relative_path
+    job.status = ReportJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    return ReportJob.objects.filter(
+        status=ReportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    ).update(status=ReportJob.STATUS_PENDING, started_at=None)
+
+
+def run_worker(interval=2.0, once=False):
+    """Цикл воркера: выполняет задачи по одной, при пустой очереди ждет interval секунд"""
+    requeue_stale_jobs()
+    while True:
+        job = claim_next_job()
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            return
+        time.sleep(interval)
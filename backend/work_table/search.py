@@ -0,0 +1,71 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+from .models import AuthorsBooks, BooksCatalog, BooksGenres
+
+SEARCH_CONFIG = 'russian'
+
+
+def _authors_subquery():
+    names = Concat(
+        'author__author_surname', Value(' '),
+        'author__author_name', Value(' '),
+        Coalesce('author__author_patronymic', Value('')),
+        output_field=TextField()
+    )
+    return Subquery(
+        AuthorsBooks.objects.filter(book=OuterRef('pk'))
+        .values('book')
+        .annotate(names=StringAgg(names, delimiter=' '))
+        .values('names'),
+        output_field=TextField()
+    )
+
+
+def _genres_subquery():
+    return Subquery(
+        BooksGenres.objects.filter(book=OuterRef('pk'))
+        .values('book')
+        .annotate(names=StringAgg('genre__name', delimiter=' '))
+        .values('names'),
+        output_field=TextField()
+    )
+
+
+def book_search_vector():
+    """
+    tsvector книги: название (A), авторы и авторский знак (B),
+    жанры (C), место и сведения об издании (D)
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(_authors_subquery(), Value('')), 'authors_mark',
+                       weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(_genres_subquery(), Value('')), weight='C', config=SEARCH_CONFIG)
+        + SearchVector('place_publication', 'information_publication',
+                       weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(book_ids=None):
+    """Пересчитывает search_vector одним UPDATE для указанных книг (или всех)"""
+    queryset = BooksCatalog.objects.all()
+    if book_ids is not None:
+        queryset = queryset.filter(id__in=book_ids)
+    return queryset.update(search_vector=book_search_vector())
+
+
+def build_search_query(text):
+    """
+    Запрос для поиска по мере ввода: все слова обязательны,
+    последнее слово ищется как префикс
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    terms = words[:-1] + [f'{words[-1]}:*']
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
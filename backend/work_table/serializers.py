@@ -9,8 +9,11 @@ from rest_framework import serializers
 from .models import(
     BooksCatalog, AuthorsCatalog, Comments,
     BookingCatalog, GenresCatalog, OrderCatalog,
-    AuthorsBooks
+    AuthorsBooks, ReportJob
 )
+from django.urls import reverse
+from .search import update_search_vector
+from .booking_actions import BOOKING_ACTIONS
 
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
@@ -121,14 +124,14 @@ class BookListSerializer(serializers.ModelSerializer):
         ]
 
     def get_authors(self, obj):
-        return AuthorShortSerializer(obj.authors(), many=True).data
+        return AuthorShortSerializer(obj.authors_list, many=True).data
 
     def get_available(self, obj):
         return obj.quantity_remaining > 0
 
 
 class BookDetailSerializer(BookListSerializer):
-    authors = AuthorShortSerializer(many=True, required=False)
+    authors = AuthorShortSerializer(source='authors_list', many=True, required=False)
     genres = GenreSerializer(many=True, required=False)
     author_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -167,6 +170,7 @@ class BookDetailSerializer(BookListSerializer):
         if genre_ids:
             book.genres.set(genre_ids)
 
+        update_search_vector([book.id])
         return book
 
     def update(self, instance, validated_data):
@@ -187,6 +191,7 @@ class BookDetailSerializer(BookListSerializer):
         if genre_ids is not None:
             book.genres.set(genre_ids)
 
+        update_search_vector([book.id])
         return book
 
 
@@ -197,6 +202,13 @@ class PopularBookSerializer(BookListSerializer):
         fields = BookListSerializer.Meta.fields + ['active_bookings']
 
 
+class TrendingBookSerializer(BookListSerializer):
+    trending_score = serializers.FloatField(read_only=True)  # Сумма затухающих весов бронирований
+
+    class Meta(BookListSerializer.Meta):
+        fields = BookListSerializer.Meta.fields + ['trending_score']
+
+
 class ReadersCatalogSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True,
@@ -385,6 +397,7 @@ class BookCreateSerializer(serializers.ModelSerializer):
         if genre_ids:
             book.genres.set(genre_ids)
 
+        update_search_vector([book.id])
         return book
 
 
@@ -461,6 +474,22 @@ class ReaderAdminUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Дата перерегистрации не может быть в прошлом")
         return value
 
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'start_date', 'end_date', 'status', 'error',
+            'created_at', 'started_at', 'finished_at', 'download_url'
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.STATUS_DONE:
+            return None
+        return reverse('report-download', kwargs={'job_id': obj.id})
+
+
 class ReportPeriodSerializer(serializers.Serializer):
     start_date = serializers.DateField(required=True)
     end_date = serializers.DateField(required=True)
@@ -470,3 +499,12 @@ class ReportPeriodSerializer(serializers.Serializer):
             raise serializers.ValidationError("Дата начала не может быть позже даты окончания")
         return data
 
+
+
+class BookingBulkItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=BOOKING_ACTIONS)
+
+
+class BookingBulkSerializer(serializers.Serializer):
+    items = BookingBulkItemSerializer(many=True, allow_empty=False, max_length=500)
@@ -0,0 +1,143 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from .catalog_cache import get_catalog_changes
+from .models import AuthorsCatalog, BooksCatalog
+
+logger = logging.getLogger(__name__)
+
+KIND_TITLE = 'title'
+KIND_AUTHOR = 'author'
+KIND_INDEX = 'index'
+
+
+def normalize(text):
+    """Нижний регистр, ё -> е, только буквы и цифры через один пробел"""
+    text = (text or '').lower().replace('ё', 'е')
+    return ' '.join(re.findall(r'\w+', text))
+
+
+def book_entries(book_id, title, index):
+    """
+    Записи индекса для книги: название целиком и с каждого следующего слова
+    (чтобы "мир" находил "Война и мир"), а также шифр книги
+    """
+    entries = []
+    words = normalize(title).split()
+    for start in range(len(words)):
+        entries.append((' '.join(words[start:]), title, KIND_TITLE, book_id))
+    if index:
+        entries.append((normalize(index), index, KIND_INDEX, book_id))
+    return entries
+
+
+def author_entries(author_id, surname, name):
+    label = f"{surname} {name}".strip()
+    return [(normalize(surname), label, KIND_AUTHOR, author_id)]
+
+
+class SuggestIndex:
+    """
+    Префиксный индекс подсказок в памяти процесса: отсортированный список
+    кортежей (нормализованный ключ, подпись, тип, id), поиск - bisect.
+    Загружается при старте воркера (warm_up в wsgi/asgi) и обновляется
+    по журналу изменений каталога (catalog_cache.bump_catalog_version),
+    поэтому запрос подсказок не обращается к PostgreSQL.
+    """
+    refresh_interval = 1.0
+
+    def __init__(self):
+        self.entries = []
+        self.by_object = {}
+        self.seq = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        try:
+            self.ensure_fresh(force=True)
+        except Exception as e:
+            # БД или Redis недоступны - индекс загрузится при первом запросе
+            logger.warning(f"Suggest index is not loaded at startup: {e}")
+
+    def rebuild(self, seq):
+        by_object = {}
+        for book_id, title, index in BooksCatalog.objects.values_list('id', 'title', 'index').iterator():
+            by_object[(KIND_TITLE, book_id)] = book_entries(book_id, title, index)
+        for author_id, surname, name in AuthorsCatalog.objects.values_list(
+                'id', 'author_surname', 'author_name').iterator():
+            by_object[(KIND_AUTHOR, author_id)] = author_entries(author_id, surname, name)
+
+        self.entries = sorted(entry for entries in by_object.values() for entry in entries)
+        self.by_object = by_object
+        self.seq = seq
+
+    def apply_changes(self, seq, changes):
+        book_ids = {book_id for change in changes for book_id in change['books']}
+        author_ids = {author_id for change in changes for author_id in change['authors']}
+
+        fresh = {}
+        for book_id, title, index in BooksCatalog.objects.filter(
+                id__in=book_ids).values_list('id', 'title', 'index'):
+            fresh[(KIND_TITLE, book_id)] = book_entries(book_id, title, index)
+        for author_id, surname, name in AuthorsCatalog.objects.filter(
+                id__in=author_ids).values_list('id', 'author_surname', 'author_name'):
+            fresh[(KIND_AUTHOR, author_id)] = author_entries(author_id, surname, name)
+
+        # Правим копию, чтобы параллельные запросы читали целый снимок
+        entries = list(self.entries)
+        by_object = dict(self.by_object)
+        changed = [(KIND_TITLE, book_id) for book_id in book_ids]
+        changed += [(KIND_AUTHOR, author_id) for author_id in author_ids]
+        for key in changed:
+            for entry in by_object.pop(key, []):
+                position = bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+            for entry in fresh.get(key, []):
+                insort(entries, entry)
+            if key in fresh:
+                by_object[key] = fresh[key]
+
+        self.entries = entries
+        self.by_object = by_object
+        self.seq = seq
+
+    def ensure_fresh(self, force=False):
+        now = time.monotonic()
+        if not force and self.seq is not None and now - self.checked_at < self.refresh_interval:
+            return
+
+        with self.lock:
+            self.checked_at = now
+            seq, changes = get_catalog_changes(self.seq or 0)
+            if self.seq is None or changes is None or any(change['rebuild'] for change in changes):
+                self.rebuild(seq)
+            elif changes:
+                self.apply_changes(seq, changes)
+
+    def suggest(self, query, limit=10):
+        self.ensure_fresh()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        entries = self.entries
+        results = []
+        seen = set()
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and len(results) < limit:
+            key, label, kind, object_id = entries[position]
+            if not key.startswith(prefix):
+                break
+            if (kind, object_id) not in seen:
+                seen.add((kind, object_id))
+                results.append({'text': label, 'type': kind, 'id': object_id})
+            position += 1
+        return results
+
+
+suggest_index = SuggestIndex()
@@ -1,3 +1,674 @@
-from django.test import TestCase
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CookieJWTAuthentication, is_token_revoked, revoke_reader_tokens
+from .catalog_cache import bump_catalog_version
+from .holds import expired_holds_cutoff, release_expired_holds_chunk
+from .pagination import KeysetPagination
+from . import popularity
+from .throttling import LoginThrottle
+from .models import (
+    AuthorsBooks, AuthorsCatalog, BookingCatalog, BooksCatalog, BooksGenres,
+    GenresCatalog, ReadersCatalog,
+)
+from .views import CustomAccessToken
+
+
+def create_book(quantity, index='1.1'):
+    return BooksCatalog.objects.create(
+        index=index,
+        authors_mark='А11',
+        title='Тестовая книга',
+        place_publication='Москва',
+        information_publication='Учебник',
+        volume=100,
+        quantity_total=quantity,
+        quantity_remaining=quantity,
+        date_publication='2020',
+    )
+
+
+def reader_fields(number, admin=False):
+    return dict(
+        surname=f'Читатель{number}',
+        name='Иван',
+        birthday=date(2000, 1, 1),
+        education='Высшее',
+        city='Москва',
+        street='Ленина',
+        house=1,
+        passport_series=1000 + number,
+        passport_number=100000 + number,
+        issued_by_whom='ОВД',
+        date_issue=date(2020, 1, 1),
+        consists_of=date(2020, 1, 1),
+        phone='+70000000000',
+        login=f'reader{number}',
+        password='password',
+        mail=f'reader{number}@example.com',
+        admin=admin,
+    )
+
+
+def create_reader(number, admin=False):
+    return ReadersCatalog.objects.create(**reader_fields(number, admin))
+
+
+def run_parallel(func, args_list):
+    """
+    Вызывает func(*args) для каждого набора аргументов в отдельном потоке,
+    стартуя все потоки одновременно. Возвращает исключения (или None) по порядку
+    """
+    barrier = threading.Barrier(len(args_list))
+
+    def worker(args):
+        barrier.wait()
+        try:
+            func(*args)
+            return None
+        except Exception as exc:
+            return exc
+        finally:
+            # У каждого потока свое соединение с БД
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(args_list)) as pool:
+        return list(pool.map(worker, args_list))
+
+
+def book_in_process(book_id, reader_ids):
+    """
+    Бронирует по экземпляру книги для каждого читателя.
+    Выполняется в дочернем процессе; возвращает число успешных броней
+    """
+    booked = 0
+    try:
+        for reader_id in reader_ids:
+            try:
+                BookingCatalog.objects.create(index_id=book_id, reader_id=reader_id, quantity=1)
+                booked += 1
+            except ValueError:
+                pass
+    finally:
+        connections.close_all()
+    return booked
+
+
+class BookingInventoryConcurrencyTests(TransactionTestCase):
+    """Остаток книги при параллельных бронированиях, возвратах и отменах"""
+
+    def setUp(self):
+        self.book = create_book(quantity=3)
+
+    def remaining(self):
+        self.book.refresh_from_db(fields=['quantity_remaining'])
+        return self.book.quantity_remaining
+
+    def test_parallel_bookings_do_not_oversell(self):
+        readers = [create_reader(n) for n in range(10)]
+
+        errors = run_parallel(
+            lambda reader: BookingCatalog.objects.create(
+                index_id=self.book.id, reader_id=reader.id, quantity=1
+            ),
+            [(reader,) for reader in readers],
+        )
+
+        failed = [error for error in errors if error is not None]
+        self.assertTrue(all(isinstance(error, ValueError) for error in failed), failed)
+        self.assertEqual(len(errors) - len(failed), 3)
+        self.assertEqual(BookingCatalog.objects.filter(index_id=self.book.id).count(), 3)
+        self.assertEqual(self.remaining(), 0)
+
+    def test_parallel_returns_restore_inventory_once(self):
+        booking = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(1).id, quantity=2
+        )
+        booking.issued = True
+        booking.save()
+        self.assertEqual(self.remaining(), 1)
+
+        # Все копии загружены до возврата - у каждой устаревший снимок returned=False
+        copies = [BookingCatalog.objects.get(pk=booking.pk) for _ in range(8)]
+        errors = run_parallel(lambda copy: copy.mark_as_returned(), [(copy,) for copy in copies])
+
+        self.assertEqual(errors, [None] * len(copies))
+        self.assertTrue(BookingCatalog.objects.get(pk=booking.pk).returned)
+        self.assertEqual(self.remaining(), 3)
+
+    def test_parallel_deletes_restore_inventory_once(self):
+        booking = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(1).id, quantity=2
+        )
+        self.assertEqual(self.remaining(), 1)
+
+        copies = [BookingCatalog.objects.get(pk=booking.pk) for _ in range(8)]
+        errors = run_parallel(lambda copy: copy.delete(), [(copy,) for copy in copies])
+
+        self.assertEqual(errors, [None] * len(copies))
+        self.assertFalse(BookingCatalog.objects.filter(pk=booking.pk).exists())
+        self.assertEqual(self.remaining(), 3)
+
+
+class BookingInventoryStressTests(TransactionTestCase):
+    """
+    Нагрузочный тест: несколько процессов (отдельные соединения с БД)
+    одновременно бронируют одну книгу, экземпляров меньше, чем попыток
+    """
+    processes = 8
+    readers_per_process = 50
+    copies = 200
+
+    def test_multiprocess_bookings_do_not_oversell(self):
+        book = create_book(quantity=self.copies)
+        total = self.processes * self.readers_per_process
+        ReadersCatalog.objects.bulk_create(
+            ReadersCatalog(**reader_fields(number)) for number in range(total)
+        )
+        reader_ids = list(ReadersCatalog.objects.order_by('id').values_list('id', flat=True))
+        chunks = [
+            (book.id, reader_ids[start::self.processes]) for start in range(self.processes)
+        ]
+
+        # Дочерние процессы не должны унаследовать открытое соединение родителя
+        connections.close_all()
+        started = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(self.processes) as pool:
+            booked = sum(pool.starmap(book_in_process, chunks))
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"\n{total} попыток бронирования в {self.processes} процессах за {elapsed:.2f} с: "
+            f"{total / elapsed:.0f} попыток/с, {booked / elapsed:.0f} броней/с",
+            file=sys.stderr
+        )
+        book.refresh_from_db(fields=['quantity_remaining'])
+        self.assertEqual(booked, self.copies)
+        self.assertEqual(BookingCatalog.objects.filter(index_id=book.id).count(), self.copies)
+        self.assertEqual(book.quantity_remaining, 0)
+
+
+class AuthorTrigramIndexTests(TestCase):
+    """Фильтр по автору (icontains) должен идти по индексам UPPER(...) gin_trgm_ops"""
+
+    def test_author_icontains_uses_upper_trigram_index(self):
+        AuthorsCatalog.objects.create(author_surname='Толстой', author_name='Лев')
+        with connection.cursor() as cursor:
+            # На таблице из одной строки планировщик иначе выберет последовательное чтение
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = AuthorsCatalog.objects.filter(author_surname__icontains='толст').explain()
+
+        self.assertIn('authors_surname_upper_trgm', plan)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Число запросов к БД на списки и карточку не должно зависеть от числа строк:
+    авторы и жанры приходят prefetch-запросами, книга и читатель брони - одним JOIN
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_reader(1)
+        genre = GenresCatalog.objects.create(name='Роман')
+        cls.books = []
+        for number in range(5):
+            book = create_book(quantity=5, index=f'1.{number}')
+            for surname in ('Толстой', 'Чехов'):
+                author = AuthorsCatalog.objects.create(author_surname=surname, author_name='А')
+                AuthorsBooks.objects.create(author=author, book=book)
+            BooksGenres.objects.create(book=book, genre=genre)
+            BookingCatalog.objects.create(index_id=book.id, reader_id=cls.reader.id, quantity=1)
+            cls.books.append(book)
+        # Бронь другого читателя не должна попадать в списки первого
+        cls.other_reader = create_reader(2)
+        cls.other_booking = BookingCatalog.objects.create(
+            index_id=cls.books[0].id, reader_id=cls.other_reader.id, quantity=1
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        # Новая версия каталога - страницы списка книг не берутся из кэша
+        bump_catalog_version()
+
+    def login(self, reader):
+        self.client.cookies['access_token'] = str(CustomAccessToken(reader))
+
+    def test_book_list(self):
+        # COUNT, страница книг, авторы, жанры
+        with self.assertNumQueries(4):
+            response = self.client.get('/books/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+        # Повторный запрос отдается из кэша страниц
+        with self.assertNumQueries(0):
+            self.client.get('/books/')
+
+    def test_catalog_queries_do_not_select_search_vector(self):
+        for url in ('/books/', f'/books/{self.books[0].id}/', '/books/popular/'):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertFalse(
+                [query['sql'] for query in queries if 'search_vector' in query['sql']]
+            )
+
+    def test_book_list_keyset(self):
+        # Страница книг, авторы, жанры - без COUNT
+        with self.assertNumQueries(3):
+            response = self.client.get('/books/', {'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+
+    def test_book_detail(self):
+        # Книга, авторы, жанры
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/books/{self.books[0].id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['authors']), 2)
+
+    def test_booking_list(self):
+        self.login(self.reader)
+        # Читатель берется из claims токена; COUNT и страница бронирований с JOIN
+        with self.assertNumQueries(2):
+            response = self.client.get('/bookings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertNotIn(self.other_booking.id, [booking['id'] for booking in response.data['results']])
+
+    def test_user_bookings_list(self):
+        self.login(self.reader)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/users/{self.reader.id}/bookings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+
+        response = self.client.get(f'/users/{self.other_reader.id}/bookings/')
+        self.assertEqual(response.status_code, 403)
+
+
+class TokenClaimsTests(TestCase):
+    """Читатель из подписанных claims токена (CustomAccessToken)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_reader(7)
+        cls.admin = create_reader(8, admin=True)
+
+    def authenticate(self, reader):
+        request = APIRequestFactory().get('/')
+        request.COOKIES['access_token'] = str(CustomAccessToken(reader))
+        user, _ = CookieJWTAuthentication().authenticate(request)
+        return user
+
+    def test_claims_fields_match_reader(self):
+        user = self.authenticate(self.reader)
+
+        self.assertIsInstance(user.id, int)
+        self.assertEqual(user.id, self.reader.id)
+        self.assertEqual(user.login, 'reader7')
+        self.assertIs(user.admin, False)
+        self.assertIs(user.is_active, True)
+        self.assertIs(self.authenticate(self.admin).admin, True)
+
+    def test_non_admin_is_forbidden_from_admin_endpoints(self):
+        client = APIClient()
+        client.cookies['access_token'] = str(CustomAccessToken(self.reader))
+
+        self.assertEqual(client.get('/admin/export/books.csv').status_code, 403)
+        self.assertEqual(client.post('/admin/bookings/bulk/', {'items': []}, format='json').status_code, 403)
+
+
+class TokenRevocationTests(TestCase):
+
+    def test_token_issued_right_after_revocation_is_valid(self):
+        reader = create_reader(1)
+        old_token = CustomAccessToken(reader)
+        revoke_reader_tokens(reader.id)
+        # Новый токен выдается в ту же секунду, что и отзыв
+        new_token = CustomAccessToken(reader)
+
+        self.assertTrue(is_token_revoked(old_token))
+        self.assertFalse(is_token_revoked(new_token))
+
+
+class ReaderIdentityTests(TestCase):
+    """Читатель из кэша учетных данных (токены без claims прав)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_reader(7)
+
+    def legacy_token(self, reader):
+        # Токен, выданный до появления claims admin и is_active
+        token = AccessToken()
+        token['user_id'] = reader.id
+        return str(token)
+
+    def test_identity_fields_match_reader(self):
+        request = APIRequestFactory().get('/')
+        request.COOKIES['access_token'] = self.legacy_token(self.reader)
+
+        user, _ = CookieJWTAuthentication().authenticate(request)
+
+        self.assertIsInstance(user.id, int)
+        self.assertEqual(user.id, self.reader.id)
+        self.assertEqual(user.login, self.reader.login)
+        self.assertIs(user.admin, False)
+        self.assertIs(user.is_active, True)
+
+    def test_non_admin_is_forbidden_from_admin_endpoint(self):
+        client = APIClient()
+        client.cookies['access_token'] = self.legacy_token(self.reader)
+
+        response = client.get('/admin/export/books.csv')
+
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Пустая дата публикации дает year_publication = NULL
+        for number, year in enumerate(['2001', '', '2001', '2003', '', '1999', '2001']):
+            book = create_book(quantity=1, index=f'2.{number}')
+            book.date_publication = year
+            book.save()
+
+    def setUp(self):
+        bump_catalog_version()
+
+    def collect_pages(self, ordering):
+        client = APIClient()
+        url, params, ids = '/books/', {'cursor': '', 'page_size': 2, 'ordering': ordering}, []
+        while url:
+            response = client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [book['id'] for book in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_pages_cover_all_books_across_nulls(self):
+        for ordering, expected in (
+            ('date_publication', BooksCatalog.objects.order_by('year_publication', 'id')),
+            ('-date_publication', BooksCatalog.objects.order_by('-year_publication', '-id')),
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(self.collect_pages(ordering), list(expected.values_list('id', flat=True)))
+
+    def test_position_filter_starts_index_range(self):
+        pagination = KeysetPagination()
+        pagination.field = 'year_publication'
+        condition = pagination.get_position_filters(
+            BooksCatalog.objects.all(), {'v': 2001, 'id': 1}, descending=False
+        )[0]
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = BooksCatalog.objects.filter(condition).order_by('year_publication', 'id').explain()
+
+        self.assertIn('books_year_pub_id_idx', plan)
+        self.assertRegex(plan, r'Index Cond: \(+year_publication >= ')
+
+
+LOGIN_THROTTLE_TEST = {
+    'LOGIN_FAILURES': 3,
+    'IP_FAILURES': 1000,
+    'WINDOW': 60,
+    'LOCKOUT': 10,
+    'MAX_LOCKOUT': 100,
+}
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def create_login_reader(number, password='secret'):
+    return ReadersCatalog.objects.create(
+        **{**reader_fields(number), 'password': make_password(password)}
+    )
+
+
+def clear_login_throttle(login, *ips):
+    """Удаляет историю, блокировки и счетчики блокировок логина и IP из Redis"""
+    scopes = [f'login_{login.lower()}'] + [f'ip_{ip}' for ip in ips]
+    cache.delete_many([
+        key(scope) for scope in scopes
+        for key in (LoginThrottle.history_key, LoginThrottle.lock_key, LoginThrottle.strikes_key)
+    ])
+
+
+@override_settings(LOGIN_THROTTLE=LOGIN_THROTTLE_TEST, PASSWORD_HASHERS=FAST_HASHERS)
+class LoginThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_login_reader(1)
+
+    def setUp(self):
+        self.client = APIClient()
+        clear_login_throttle(self.reader.login, '127.0.0.1')
+        self.addCleanup(clear_login_throttle, self.reader.login, '127.0.0.1')
+
+    def login(self, password):
+        return self.client.post('/login/', {'login': self.reader.login, 'password': password}, format='json')
+
+    def fail(self, times):
+        for _ in range(times):
+            self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_lockout_after_failures(self):
+        self.fail(LOGIN_THROTTLE_TEST['LOGIN_FAILURES'])
+
+        response = self.login('secret')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response['Retry-After']), range(1, LOGIN_THROTTLE_TEST['LOCKOUT'] + 2))
+
+    def test_lockout_grows_exponentially(self):
+        throttle = LoginThrottle(APIRequestFactory().post('/login/'), self.reader.login)
+        scope, _ = throttle.scopes[0]
+
+        lockouts = []
+        for _ in range(5):
+            for _ in range(LOGIN_THROTTLE_TEST['LOGIN_FAILURES']):
+                throttle.register_failure()
+            lockouts.append(throttle.retry_after())
+            # Блокировка истекла - следующая серия ошибок
+            cache.delete(LoginThrottle.lock_key(scope))
+
+        # LOCKOUT удваивается с каждой блокировкой, пока не упрется в MAX_LOCKOUT
+        self.assertEqual(len(lockouts), 5)
+        for lockout, expected in zip(lockouts, (10, 20, 40, 80, 100)):
+            self.assertIn(lockout, (expected, expected + 1))
+
+    def test_successful_login_resets_failures(self):
+        failures = LOGIN_THROTTLE_TEST['LOGIN_FAILURES'] - 1
+        self.fail(failures)
+        self.assertEqual(self.login('secret').status_code, 200)
+
+        # После успешного входа счет ошибок начинается заново
+        self.fail(failures)
+        self.assertEqual(self.login('secret').status_code, 200)
+
+
+# Блокировка не должна истечь, пока идет тест
+@override_settings(LOGIN_THROTTLE={**LOGIN_THROTTLE_TEST, 'LOCKOUT': 600, 'MAX_LOCKOUT': 600},
+                   PASSWORD_HASHERS=FAST_HASHERS)
+class LoginThrottleLoadTests(TransactionTestCase):
+    """Успешные входы с другого IP не страдают от параллельного перебора чужого логина"""
+    attackers = 8
+    attempts_per_attacker = 50
+    valid_logins = 100
+
+    def setUp(self):
+        self.victim = create_login_reader(1)
+        self.user = create_login_reader(2)
+        for reader in (self.victim, self.user):
+            clear_login_throttle(reader.login, '10.0.0.1', '10.0.0.2')
+            self.addCleanup(clear_login_throttle, reader.login, '10.0.0.1', '10.0.0.2')
+
+    def test_valid_login_throughput_during_failure_burst(self):
+        failures = []
+
+        def attack():
+            client = APIClient(REMOTE_ADDR='10.0.0.1')
+            try:
+                for _ in range(self.attempts_per_attacker):
+                    failures.append(client.post(
+                        '/login/', {'login': self.victim.login, 'password': 'wrong'}, format='json'
+                    ).status_code)
+            finally:
+                connection.close()
+
+        client = APIClient(REMOTE_ADDR='10.0.0.2')
+        with ThreadPoolExecutor(max_workers=self.attackers) as pool:
+            burst = [pool.submit(attack) for _ in range(self.attackers)]
+            started = time.perf_counter()
+            statuses = [
+                client.post('/login/', {'login': self.user.login, 'password': 'secret'}, format='json').status_code
+                for _ in range(self.valid_logins)
+            ]
+            elapsed = time.perf_counter() - started
+            for future in burst:
+                future.result()
+
+        print(
+            f"\n{self.valid_logins} успешных входов за {elapsed:.2f} с "
+            f"({self.valid_logins / elapsed:.0f} входов/с) на фоне "
+            f"{len(failures)} неудачных попыток в {self.attackers} потоках",
+            file=sys.stderr
+        )
+        self.assertEqual(statuses, [200] * self.valid_logins)
+        # Перебор упирается в блокировку: 401 получают только попытки до нее
+        # (и те, что уже прошли проверку блокировки в других потоках)
+        self.assertLess(failures.count(401), LOGIN_THROTTLE_TEST['LOGIN_FAILURES'] + self.attackers)
+        self.assertEqual(failures.count(401) + failures.count(429), len(failures))
+
+
+class PopularBooksLeaderboardTests(TestCase):
+
+    def setUp(self):
+        self.redis = popularity._redis()
+        self.redis.delete(popularity._key())
+        self.addCleanup(self.redis.delete, popularity._key())
+
+        self.books = [create_book(quantity=5, index=f'3.{number}') for number in range(2)]
+        reader = create_reader(1)
+        for book in self.books:
+            BookingCatalog.objects.create(index_id=book.id, reader_id=reader.id, quantity=1)
+        BookingCatalog.objects.update(issued=True)
+
+    def test_increment_does_not_create_partial_leaderboard(self):
+        # Рейтинг потерян в Redis: выдача не должна создать ZSET из одной книги
+        with self.captureOnCommitCallbacks(execute=True):
+            popularity.record_issued_delta(self.books[0].id, 1)
+        self.assertFalse(self.redis.exists(popularity._key()))
+
+        # Первый запрос пересобирает полный рейтинг из БД
+        self.assertCountEqual(popularity.top_books(), [(self.books[0].id, 1), (self.books[1].id, 1)])
+
+    def test_increment_applies_to_built_leaderboard(self):
+        popularity.reconcile()
+        with self.captureOnCommitCallbacks(execute=True):
+            popularity.record_issued_delta(self.books[1].id, 2)
+
+        self.assertEqual(popularity.top_books(), [(self.books[1].id, 3), (self.books[0].id, 1)])
+
+
+class BookingDirtyFieldsTests(TestCase):
+    """Сохранение бронирования, загруженного с only()/defer()"""
+
+    def setUp(self):
+        self.book = create_book(quantity=3)
+        self.booking = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(1).id, quantity=1
+        )
+
+    def test_change_to_deferred_field_is_saved(self):
+        booking = BookingCatalog.objects.only('id').get(pk=self.booking.pk)
+        booking.date_return = date(2030, 1, 1)
+        booking.save()
+
+        self.assertEqual(BookingCatalog.objects.get(pk=self.booking.pk).date_return, date(2030, 1, 1))
+
+    def test_previous_state_of_deferred_flags_comes_from_db(self):
+        booking = BookingCatalog.objects.get(pk=self.booking.pk)
+        booking.issued = True
+        booking.save()
+
+        # issued и returned отложены: возврат должен увидеть issued=True в БД
+        booking = BookingCatalog.objects.defer('issued', 'returned').get(pk=self.booking.pk)
+        booking.returned = True
+        booking.save()
+
+        self.book.refresh_from_db(fields=['quantity_remaining'])
+        self.assertEqual(self.book.quantity_remaining, 3)
+        self.assertTrue(BookingCatalog.objects.get(pk=self.booking.pk).returned)
+
+
+class ExpiredHoldsReleaseTests(TestCase):
+    """Снятие просроченных невыданных броней пачкой"""
+
+    def setUp(self):
+        self.book = create_book(quantity=5)
+        old = expired_holds_cutoff() - timedelta(days=1)
+        self.expired = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(1).id, quantity=2, date_issue=old
+        )
+        self.fresh = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(2).id, quantity=1
+        )
+        self.issued = BookingCatalog.objects.create(
+            index_id=self.book.id, reader_id=create_reader(3).id, quantity=1, date_issue=old
+        )
+        self.issued.issued = True
+        self.issued.save()
+
+    def remaining(self):
+        self.book.refresh_from_db(fields=['quantity_remaining'])
+        return self.book.quantity_remaining
+
+    def test_expired_hold_is_released_and_inventory_restored(self):
+        self.assertEqual(self.remaining(), 1)
+
+        released, book_ids = release_expired_holds_chunk(expired_holds_cutoff(), 100)
+
+        self.assertEqual((released, book_ids), (1, [self.book.id]))
+        self.assertEqual(self.remaining(), 3)
+        self.assertFalse(BookingCatalog.objects.filter(pk=self.expired.pk).exists())
+
+    def test_issued_and_fresh_bookings_are_untouched(self):
+        before = {
+            booking.pk: (booking.quantity, booking.date_issue, booking.issued, booking.returned)
+            for booking in BookingCatalog.objects.filter(pk__in=[self.fresh.pk, self.issued.pk])
+        }
+
+        release_expired_holds_chunk(expired_holds_cutoff(), 100)
+
+        after = {
+            booking.pk: (booking.quantity, booking.date_issue, booking.issued, booking.returned)
+            for booking in BookingCatalog.objects.filter(pk__in=[self.fresh.pk, self.issued.pk])
+        }
+        self.assertEqual(after, before)
+        self.assertEqual(len(after), 2)
+
+    def test_release_can_be_limited_to_books(self):
+        other_book = create_book(quantity=1, index='1.2')
+
+        released, _ = release_expired_holds_chunk(expired_holds_cutoff(), 100, book_ids=[other_book.id])
+
+        self.assertEqual(released, 0)
+        self.assertTrue(BookingCatalog.objects.filter(pk=self.expired.pk).exists())
+        self.assertEqual(self.remaining(), 1)
@@ -0,0 +1,91 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_LOGIN_THROTTLE = {
+    'LOGIN_FAILURES': 5,    # неудачных попыток на один логин за окно
+    'IP_FAILURES': 20,      # неудачных попыток с одного IP за окно
+    'WINDOW': 60 * 5,       # скользящее окно, секунды
+    'LOCKOUT': 30,          # первая блокировка, секунды
+    'MAX_LOCKOUT': 60 * 60, # верхняя граница экспоненциальной блокировки
+}
+
+
+class LoginThrottle:
+    """
+    Ограничение перебора паролей без задержек в потоке обработчика.
+    Неудачные попытки хранятся в Redis как история отметок времени (ZSET,
+    скользящее окно, как в DRF SimpleRateThrottle) отдельно для логина и для IP.
+    При превышении лимита ключ блокируется на LOCKOUT * 2**n секунд,
+    где n - число предыдущих блокировок.
+    """
+
+    def __init__(self, request, login):
+        self.config = {**DEFAULT_LOGIN_THROTTLE, **getattr(settings, 'LOGIN_THROTTLE', {})}
+        self.scopes = [
+            (f'login_{login.lower()}', self.config['LOGIN_FAILURES']),
+            (f'ip_{BaseThrottle().get_ident(request)}', self.config['IP_FAILURES']),
+        ]
+
+    @staticmethod
+    def history_key(scope):
+        return f'login_throttle_history_{scope}'
+
+    @staticmethod
+    def lock_key(scope):
+        return f'login_throttle_lock_{scope}'
+
+    @staticmethod
+    def strikes_key(scope):
+        return f'login_throttle_strikes_{scope}'
+
+    def retry_after(self):
+        """Сколько секунд осталось до снятия блокировки (0 - попытка разрешена)"""
+        now = time.time()
+        locks = cache.get_many([self.lock_key(scope) for scope, _ in self.scopes])
+        if not locks:
+            return 0
+        return max(0, int(max(locks.values()) - now) + 1)
+
+    def register_failure(self):
+        """
+        История ведется в Redis ZSET и меняется одним конвейером MULTI/EXEC,
+        поэтому параллельные неудачные попытки не теряются
+        """
+        now = time.time()
+        window = self.config['WINDOW']
+        redis = get_redis_connection('default')
+
+        for scope, limit in self.scopes:
+            key = cache.make_key(self.history_key(scope))
+            pipe = redis.pipeline()
+            pipe.zremrangebyscore(key, '-inf', now - window)
+            pipe.zadd(key, {uuid.uuid4().hex: now})
+            pipe.zcard(key)
+            pipe.expire(key, window)
+            attempts = pipe.execute()[2]
+
+            # Блокировку ставит только тот запрос, который забрал историю
+            if attempts < limit or not redis.delete(key):
+                continue
+
+            strikes_key = cache.make_key(self.strikes_key(scope))
+            pipe = redis.pipeline()
+            pipe.incr(strikes_key)
+            pipe.expire(strikes_key, self.config['MAX_LOCKOUT'] * 2)
+            strikes = pipe.execute()[0]
+            lockout = min(self.config['LOCKOUT'] * 2 ** (strikes - 1), self.config['MAX_LOCKOUT'])
+            cache.set(self.lock_key(scope), now + lockout, timeout=lockout)
+
+    def reset(self):
+        """Успешный вход сбрасывает счетчики логина, но не IP"""
+        scope, _ = self.scopes[0]
+        cache.delete_many([
+            self.history_key(scope),
+            self.lock_key(scope),
+            self.strikes_key(scope),
+        ])
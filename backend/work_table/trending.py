@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import BookingCatalog, BooksCatalog
+
+TRENDING_KEY = 'trending_books'
+TRENDING_HALF_LIFE_DAYS = 14
+TRENDING_LIMIT = 50
+TRENDING_FETCH_SIZE = 200_000
+
+
+def compute_trending(limit=TRENDING_LIMIT, half_life_days=TRENDING_HALF_LIFE_DAYS):
+    """
+    score(книга) = сумма exp(-lambda * возраст бронирования в днях), lambda = ln2 / half_life.
+    Пары (index_id, возраст) читаются серверным курсором пачками и сразу
+    сворачиваются np.bincount с весами, поэтому память не зависит от числа бронирований.
+    Результат - top-N [(book_id, score)] - кладется в кэш, эндпоинт его только читает.
+    """
+    decay = math.log(2) / half_life_days
+    max_book_id = BooksCatalog.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    scores = np.zeros(max_book_id + 1, dtype=np.float64)
+
+    today = timezone.now().date()
+    sql = (
+        f'SELECT index_id, GREATEST(%s - date_issue, 0) '
+        f'FROM "{BookingCatalog._meta.db_table}" WHERE index_id <= %s'
+    )
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, [today, max_book_id])
+        while True:
+            rows = cursor.fetchmany(TRENDING_FETCH_SIZE)
+            if not rows:
+                break
+            batch = np.array(rows, dtype=np.int64)
+            weights = np.exp(-decay * batch[:, 1])
+            scores += np.bincount(batch[:, 0], weights=weights, minlength=scores.size)
+
+    candidates = np.flatnonzero(scores)
+    if candidates.size > limit:
+        candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+    top = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    ranking = [(int(book_id), round(float(scores[book_id]), 4)) for book_id in top]
+    cache.set(TRENDING_KEY, {'computed_at': timezone.now().isoformat(), 'books': ranking}, timeout=None)
+    return ranking
+
+
+def get_trending():
+    """Последний посчитанный рейтинг или None, если задача еще не запускалась"""
+    return cache.get(TRENDING_KEY)
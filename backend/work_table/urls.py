@@ -2,16 +2,18 @@ from django.urls import path
 from .views import (
     RegisterReaderView, LoginAPIView, LogoutAPIView,
     RefreshTokenView, UserProfileView, AuthCheckView,
-    BookListView, BookDetailView, PopularBooksView,
+    BookListView, BookDetailView, PopularBooksView, BookFacetsView,
+    BookSuggestView, TrendingBooksView, LiveEventsView,
     CommentListCreateView, CommentDetailView, UserBookingsListView,
     BookingDetailView, BookingListCreateView, UserBookingsView,
     ProfileUpdateView, OrderListView, StatisticsView,
     BookAdminListView, BookAdminDetailView, BookingAdminDetailView,
-    AuthorListView, GenreListView, BookingAdminView, BookCoverView,
+    AuthorListView, GenreListView, BookingAdminView, BookCoverView, BookingAdminBulkView,
     AuthorAdminView, AuthorAdminDetailView, AdminOrderDetailView,
     GenreAdminView, GenreAdminDetailView, AdminOrderListView,
     SendReaderEmailView, ReaderDetailView, ReaderListView,
-    ReaderAdminUpdateView, GenerateReportView, ReaderAdminDeleteView
+    ReaderAdminUpdateView, GenerateReportView, ReaderAdminDeleteView,
+    ReportStatusView, ReportDownloadView, ExportView
 )
 
 urlpatterns = [
@@ -28,6 +30,10 @@ urlpatterns = [
     path('books/', BookListView.as_view(), name='book-list'),
     path('books/<int:id>/', BookDetailView.as_view(), name='book-detail'),
     path('books/popular/', PopularBooksView.as_view(), name='popular-books'),
+    path('books/trending/', TrendingBooksView.as_view(), name='trending-books'),
+    path('events/', LiveEventsView.as_view(), name='live-events'),
+    path('books/facets/', BookFacetsView.as_view(), name='book-facets'),
+    path('books/suggest/', BookSuggestView.as_view(), name='book-suggest'),
 
     # Комментарии
     path('comments/', CommentListCreateView.as_view(), name='comment-list'),
@@ -39,6 +45,7 @@ urlpatterns = [
     path('users/<int:user_id>/bookings/', UserBookingsListView.as_view(), name='user-bookings-list'),
     path('bookings/my/', UserBookingsView.as_view(), name='user-bookings-my'),
     path('admin/bookings/', BookingAdminView.as_view(), name='admin-bookings-list'),
+    path('admin/bookings/bulk/', BookingAdminBulkView.as_view(), name='admin-bookings-bulk'),
     path('admin/bookings/<int:pk>/', BookingAdminDetailView.as_view(), name='admin-bookings-detail'),
 
     # Заказы
@@ -77,4 +84,7 @@ urlpatterns = [
 
     #Отчёт
     path('report/', GenerateReportView.as_view(), name='generate-report'),
+    path('report/<int:job_id>/', ReportStatusView.as_view(), name='report-status'),
+    path('report/<int:job_id>/download/', ReportDownloadView.as_view(), name='report-download'),
+    path('admin/export/<slug:entity>.<slug:export_format>', ExportView.as_view(), name='admin-export'),
 ]
\ No newline at end of file
@@ -8,22 +8,36 @@ from django.contrib.auth.hashers import check_password, make_password
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from .models import ReadersCatalog, AuthorsCatalog
 from .serializers import ReadersCatalogSerializer
-import time
-from rest_framework.exceptions import PermissionDenied
+from .authentication import get_request_reader, revoke_reader_tokens
+from .throttling import LoginThrottle
+from .catalog_cache import bump_catalog_version, catalog_cache_key, get_catalog_version
+from rest_framework.exceptions import APIException, PermissionDenied
 import logging
+import time
 from datetime import datetime
 from django.utils import timezone
-from rest_framework.pagination import PageNumberPagination
+from .pagination import BookPagination, KeysetPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
 from .serializers import (
-    BookListSerializer, BookDetailSerializer, PopularBookSerializer,
+    BookListSerializer, BookDetailSerializer, PopularBookSerializer, TrendingBookSerializer,
     BookingSerializer, BookingCreateSerializer, StatisticsSerializer,
     AuthorShortSerializer, GenreSerializer, BookCreateSerializer,
     ReaderEmailSerializer, ReaderListSerializer, ReaderDetailSerializer,
-    ReaderAdminUpdateSerializer
+    ReaderAdminUpdateSerializer, BookingBulkSerializer
 )
-from .filters import BookFilter, DebtorFilter
+from .filters import BookFilter, BookOrderingFilter, BookingFilter, DebtorFilter, FullTextSearchFilter
+from .search import update_search_vector
+from .suggest import suggest_index
+from .popularity import POPULARITY_WINDOWS, top_books, window_top_books
+from .trending import TRENDING_LIMIT, get_trending
+from .booking_actions import apply_booking_actions
+from .debtors import debtor_count
+from .counters import exact_counters, get_counters
+from .live import event_stream, hub as live_hub, publish_availability
+from .authentication import CookieJWTAuthentication
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.views import View
 from django.core.cache import cache
 from django.db.models import Prefetch
 from .models import AuthorsBooks, BookingCatalog, BooksCatalog, GenresCatalog
@@ -36,102 +50,170 @@ from .models import OrderCatalog
 from .serializers import OrderSerializer
 from .filters import OrderFilter
 from rest_framework.exceptions import ValidationError
-import pandas as pd
-from io import BytesIO
-from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from datetime import timedelta
-from django.db.models import Count, Sum
-from .serializers import ReportPeriodSerializer
+from django.db.models import Count, Sum, Min, Max
+from .serializers import ReportJobSerializer, ReportPeriodSerializer
+from .models import ReportJob
+from .reports import enqueue_report
+from .exports import EXPORT_ENTITIES, EXPORT_FORMATS, astream_export, stream_export
+from django.core.handlers.asgi import ASGIRequest
 
 logger = logging.getLogger(__name__)
 
+
+def is_asgi_request(request):
+    """Запрос обслуживает ASGI-сервер (DRF Request оборачивает HttpRequest)"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
 class AdminPermissionMixin:
     """
-    Миксин для проверки прав администратора через куки
+    Миксин для проверки прав администратора.
+    Пользователь уже определен CookieJWTAuthentication в request.user
     """
     def check_admin_permissions(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            logger.warning("Access token not found in cookies")
+        user = get_request_reader(request)
+        if user is None:
+            logger.warning("Access token not found or invalid")
             raise PermissionDenied("Требуется авторизация")
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            if not user.admin:
-                logger.warning(f"User {user.id} attempted admin access without permissions")
-                raise PermissionDenied("Требуются права администратора")
-            return user
-        except Exception as e:
-            logger.error(f"Error verifying admin permissions: {str(e)}")
-            raise PermissionDenied("Недействительный токен")
+        if not user.admin:
+            logger.warning(f"User {user.id} attempted admin access without permissions")
+            raise PermissionDenied("Требуются права администратора")
+        return user
 
-    def dispatch(self, request, *args, **kwargs):
-        try:
-            self.check_admin_permissions(request)
-            return super().dispatch(request, *args, **kwargs)
-        except PermissionDenied as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_403_FORBIDDEN
-            )
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.check_admin_permissions(request)
+
+class RankedBooksMixin:
+    """Карточки книг из готового рейтинга [(book_id, значение)] одним запросом с prefetch"""
+    ranking_limit = 10
+
+    def get_book_queryset(self):
+        return BooksCatalog.objects.defer('search_vector').prefetch_related(
+            Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
+            'genres'
+        )
+
+    def get_ranked_books(self, ranking, score_field):
+        scores = dict(ranking)
+        by_id = {book.id: book for book in self.get_book_queryset().filter(id__in=scores)}
 
-class PopularBooksView(generics.ListAPIView):
+        result = []
+        for book_id, _ in ranking:
+            book = by_id.get(book_id)
+            if book is not None:
+                setattr(book, score_field, scores[book_id])
+                result.append(book)
+        return result
+
+
+class PopularBooksView(RankedBooksMixin, generics.ListAPIView):
     serializer_class = PopularBookSerializer
     pagination_class = None
 
     def get_queryset(self):
-        cache_key = 'popular_books_top10_issued'
-        queryset = cache.get(cache_key)
-
-        if not queryset:
-            queryset = BooksCatalog.objects.annotate(
-                active_bookings=Count(
-                    'bookingcatalog',
-                    filter=Q(bookingcatalog__issued=True)  # Только выданные книги
-                )
-            ).order_by('-active_bookings')[:10]
-            cache.set(cache_key, queryset, timeout=3600)
-        return queryset
+        # Рейтинг за все время хранится в Redis ZSET и поддерживается при выдаче/удалении
+        # бронирований, рейтинг за окно (?window=7d|30d|365d) - по BookingDailyStats
+        limit = self.ranking_limit
+        window = self.request.query_params.get('window')
+        if window:
+            if window not in POPULARITY_WINDOWS:
+                raise ValidationError({'window': f"Допустимые значения: {', '.join(POPULARITY_WINDOWS)}"})
+            ranking = window_top_books(POPULARITY_WINDOWS[window], limit)
+        else:
+            ranking = top_books(limit)
+        result = self.get_ranked_books(ranking, 'active_bookings')
+
+        # Как и раньше, список дополняется книгами без выдач
+        if len(result) < limit:
+            extra = self.get_book_queryset().exclude(id__in=[book_id for book_id, _ in ranking])
+            for book in extra.order_by('id')[:limit - len(result)]:
+                book.active_bookings = 0
+                result.append(book)
+        return result
+
+
+class TrendingBooksView(RankedBooksMixin, generics.ListAPIView):
+    """
+    Набирающие популярность книги. Рейтинг считает периодическая задача
+    compute_trending_books, здесь он только читается из кэша
+    """
+    serializer_class = TrendingBookSerializer
+    pagination_class = None
 
+    def get_queryset(self):
+        limit = self.ranking_limit
+        try:
+            limit = max(1, min(int(self.request.query_params.get('limit', limit)), TRENDING_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': "Ожидается целое число"})
+
+        trending = get_trending()
+        if not trending:
+            return []
+        return self.get_ranked_books(trending['books'][:limit], 'trending_score')
+
+
+class LiveEventsView(View):
+    """
+    Server-sent events: изменения остатков книг (всем) и статистики (администраторам).
+    Асинхронное представление - рассчитано на запуск через backend.asgi,
+    где открытое соединение не занимает поток воркера. Под WSGI бесконечный
+    поток занял бы воркер на каждую вкладку, поэтому отдается 204:
+    EventSource закрывается, и клиент переходит на опрос /statistics/.
+    """
+    async def get(self, request):
+        if not is_asgi_request(request):
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        auth = await sync_to_async(CookieJWTAuthentication().authenticate)(request)
+        admin = bool(auth and auth[0].admin)
+
+        subscriber = live_hub.subscribe(admin)
+        response = StreamingHttpResponse(event_stream(subscriber), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Без буферизации в nginx
+        return response
 
-class BookPagination(PageNumberPagination):
-    page_size = 12
-    page_size_query_param = 'page_size'
-    max_page_size = 100
 
 class BookListView(generics.ListAPIView):
     serializer_class = BookListSerializer
     pagination_class = BookPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BookOrderingFilter, FullTextSearchFilter]
     filterset_class = BookFilter
-    search_fields = ['title', 'authors_mark', 'index']
     ordering_fields = ['title', 'date_publication', 'quantity_remaining']
     ordering = ['title']
 
     def get_queryset(self):
-        cache_key = f"books_{self.request.query_params}"
-        queryset = cache.get(cache_key)
-        if not queryset:
-            queryset = BooksCatalog.objects.all().prefetch_related(
-                Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
-                Prefetch('genres')
-            )
-            cache.set(cache_key, queryset, timeout=60 * 15)
-        return queryset
+        # search_vector нужен только в WHERE поиска, в SELECT он не выбирается
+        return BooksCatalog.objects.defer('search_vector').prefetch_related(
+            Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
+            Prefetch('genres')
+        )
 
     def list(self, request, *args, **kwargs):
+        # Кэшируем готовую страницу; ключ зависит от версии каталога
+        cache_key = catalog_cache_key('books_list', request.query_params)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
         response = super().list(request, *args, **kwargs)
+        # Количество уже посчитано пагинатором (в режиме cursor - только по ?count=true)
         response.data['meta'] = {
-            'total_books': self.get_queryset().count(),
-            'filters_available': list(self.filterset_class.Meta.fields.keys())
+            'total_books': response.data.get('count'),
         }
+        cache.set(cache_key, response.data, timeout=60 * 15)
         return response
 
-
     def handle_exception(self, exc):
+        # Ошибки API (некорректный курсор, 404 страницы и т. п.) отдаются как есть
+        if isinstance(exc, APIException):
+            return super().handle_exception(exc)
         logger.error(f"Error in BookListView: {str(exc)}")
         return Response(
             {"error": "Произошла ошибка при загрузке книг"},
@@ -139,14 +221,108 @@ class BookListView(generics.ListAPIView):
         )
 
 
-class BookDetailView(generics.RetrieveAPIView):
+class BookFacetsView(generics.GenericAPIView):
+    """
+    Количество книг по жанрам, наличию и десятилетиям издания
+    для текущих фильтров и поиска /books/. Все счетчики считаются
+    одним агрегирующим запросом с условными COUNT.
+    """
     queryset = BooksCatalog.objects.all()
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    filterset_class = BookFilter
+    # Параметры, не влияющие на фасеты
+    ignored_params = ('page', 'page_size', 'ordering', 'cursor', 'count')
+
+    def get(self, request):
+        cache_key = catalog_cache_key('books_facets', request.query_params, exclude=self.ignored_params)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        genres = list(GenresCatalog.objects.order_by('name').values('id', 'name'))
+        decades = self.get_decades()
+
+        # Книги отбираем полусоединением, чтобы JOIN с жанрами не задел фильтры
+        books = BooksCatalog.objects.filter(id__in=self.filter_queryset(self.get_queryset()).values('id'))
+        counts = books.aggregate(
+            total=Count('id', distinct=True),
+            available=Count('id', distinct=True, filter=Q(quantity_remaining__gt=0)),
+            unavailable=Count('id', distinct=True, filter=Q(quantity_remaining=0)),
+            **{
+                f'genre_{genre["id"]}': Count('id', distinct=True, filter=Q(booksgenres__genre_id=genre['id']))
+                for genre in genres
+            },
+            **{
+                f'decade_{decade}': Count('id', distinct=True, filter=Q(
+                    year_publication__gte=decade,
+                    year_publication__lt=decade + 10
+                ))
+                for decade in decades
+            }
+        )
+
+        data = {
+            'total': counts['total'],
+            'availability': {
+                'available': counts['available'],
+                'unavailable': counts['unavailable'],
+            },
+            'genres': [
+                {**genre, 'count': counts[f'genre_{genre["id"]}']}
+                for genre in genres
+                if counts[f'genre_{genre["id"]}']
+            ],
+            'decades': [
+                {'decade': decade, 'count': counts[f'decade_{decade}']}
+                for decade in decades
+                if counts[f'decade_{decade}']
+            ],
+        }
+        cache.set(cache_key, data, timeout=60 * 15)
+        return Response(data)
+
+    @staticmethod
+    def get_decades():
+        """Десятилетия, встречающиеся в каталоге (кэшируются по версии каталога)"""
+        cache_key = f'books_decades_v{get_catalog_version()}'
+        decades = cache.get(cache_key)
+        if decades is None:
+            bounds = BooksCatalog.objects.aggregate(
+                first=Min('year_publication'),
+                last=Max('year_publication')
+            )
+            if bounds['first'] is None:
+                decades = []
+            else:
+                decades = list(range(bounds['first'] // 10 * 10, bounds['last'] + 1, 10))
+            cache.set(cache_key, decades, timeout=60 * 60)
+        return decades
+
+
+class BookSuggestView(APIView):
+    """
+    Подсказки для строки поиска по названиям, фамилиям авторов и шифрам.
+    Отвечает из индекса в памяти процесса, без запросов к БД.
+    """
+    max_limit = 20
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        return Response({'results': suggest_index.suggest(query, limit=limit)})
+
+
+class BookDetailView(generics.RetrieveAPIView):
+    queryset = BooksCatalog.objects.defer('search_vector')
     serializer_class = BookDetailSerializer
     lookup_field = 'id'
 
     def get_queryset(self):
         return super().get_queryset().prefetch_related(
-            'authorsbooks_set__author',
+            Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
             'genres'
         )
 
@@ -192,6 +368,11 @@ class CustomAccessToken(AccessToken):
         super().__init__(*args, **kwargs)
         self['user_id'] = user.id
         self['login'] = user.login
+        # Права и статус подписаны в токене, чтобы проверка прав не ходила в БД
+        self['admin'] = user.admin
+        self['is_active'] = user.is_active
+        # С долями секунды - для сравнения с моментом отзыва (is_token_revoked)
+        self['iat'] = time.time()
         self['exp'] = int((datetime.now() + timedelta(hours=1)).timestamp())
 
 
@@ -247,6 +428,19 @@ class LoginAPIView(AuthAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        throttle = LoginThrottle(request, login_input)
+        retry_after = throttle.retry_after()
+        if retry_after:
+            return Response(
+                {
+                    "success": False,
+                    "code": "too_many_attempts",
+                    "message": "Слишком много попыток входа. Повторите позже."
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(retry_after)}
+            )
+
         try:
             user = ReadersCatalog.objects.get(login=login_input)
 
@@ -261,11 +455,10 @@ class LoginAPIView(AuthAPIView):
                 )
 
             if not check_password(password_input, user.password):
-                time.sleep(2)  # Задержка при неверном пароле
                 raise ReadersCatalog.DoesNotExist
 
         except ReadersCatalog.DoesNotExist:
-            time.sleep(2)  # Задержка при неверном логине
+            throttle.register_failure()
             return Response(
                 {
                     "success": False,
@@ -275,6 +468,8 @@ class LoginAPIView(AuthAPIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        throttle.reset()
+
         # Создаем сериализованные данные пользователя
         user_data = ReadersCatalogSerializer(user).data
         # Добавляем роль в ответ
@@ -332,7 +527,7 @@ class RefreshTokenView(AuthAPIView):
 
         try:
             refresh = RefreshToken(refresh_token)
-            user = ReadersCatalog.objects.get(id=refresh['user_id'])
+            user = ReadersCatalog.objects.get(id=refresh['user_id'], is_active=True)
 
             response = Response(
                 {
@@ -362,9 +557,9 @@ class UserProfileView(APIView):
     """
 
     def get(self, request):
-        access_token = request.COOKIES.get('access_token')
+        reader = get_request_reader(request)
 
-        if not access_token:
+        if not reader:
             return Response(
                 {
                     "success": False,
@@ -375,8 +570,8 @@ class UserProfileView(APIView):
             )
 
         try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
+            # Профилю нужна полная запись читателя
+            user = ReadersCatalog.objects.get(id=reader.id)
             return Response(
                 {
                     "success": True,
@@ -403,17 +598,17 @@ class AuthCheckView(APIView):
     """
 
     def get(self, request):
-        access_token = request.COOKIES.get('access_token')
+        reader = get_request_reader(request)
 
-        if not access_token:
+        if not reader:
             return Response(
                 {"success": False, "message": "Токен отсутствует"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
         try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
+            # Профилю нужна полная запись читателя
+            user = ReadersCatalog.objects.get(id=reader.id)
             return Response(
                 {
                     "success": True,
@@ -439,23 +634,12 @@ class CommentListCreateView(APIView):
         return Response(serializer.data)
 
     def post(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
+        if not get_request_reader(request):
             return Response(
-                {"detail": "Требуется авторизация: access_token не найден в cookies"},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-        except Exception as e:
-            logger.error(f"Ошибка при проверке токена или получении пользователя: {e}")
-            return Response(
-                {"detail": "Недействительный или истёкший токен"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        request.user = user  # Важно! Подменяем request.user
         serializer = CommentSerializer(data=request.data, context={'request': request})
 
         if not serializer.is_valid():
@@ -479,18 +663,6 @@ class CommentDetailView(APIView):
         except Comments.DoesNotExist:
             return None
 
-    def get_user_from_token(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get(self, request, pk):
         comment = self.get_comment(pk)
         if not comment:
@@ -503,11 +675,11 @@ class CommentDetailView(APIView):
         if not comment:
             return Response({"detail": "Комментарий не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response({"detail": "Требуется авторизация"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if comment.user != user and not user.admin:
+        if comment.user_id != user.id and not user.admin:
             raise PermissionDenied("У вас нет прав для этого действия")
 
         serializer = CommentSerializer(comment, data=request.data, partial=False, context={'request': request})
@@ -521,11 +693,11 @@ class CommentDetailView(APIView):
         if not comment:
             return Response({"detail": "Комментарий не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response({"detail": "Требуется авторизация"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if comment.user != user and not user.admin:
+        if comment.user_id != user.id and not user.admin:
             raise PermissionDenied("У вас нет прав для этого действия")
 
         serializer = CommentSerializer(comment, data=request.data, partial=True, context={'request': request})
@@ -539,59 +711,69 @@ class CommentDetailView(APIView):
         if not comment:
             return Response({"detail": "Комментарий не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response({"detail": "Требуется авторизация"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if comment.user != user and not user.admin:
+        if comment.user_id != user.id and not user.admin:
             raise PermissionDenied("У вас нет прав для этого действия")
 
         comment.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class BookingListCreateView(APIView):
+class BookingListMixin:
     """
-    Список бронирований и создание нового бронирования с проверкой токена в куки
+    Постраничный список бронирований с фильтрами BookingFilter.
+    Сериализатору нужны только название книги и имя читателя, поэтому
+    связанные таблицы подтягиваются одним JOIN и только нужными столбцами
     """
-    pagination_class = BookPagination
-    def get(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return Response(
-                {"detail": "Требуется авторизация: access_token не найден в cookies"},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
+    booking_fields = (
+        'id', 'index_id', 'reader_id', 'quantity', 'date_issue',
+        'date_return', 'issued', 'returned',
+        'index__title', 'reader__surname', 'reader__name',
+    )
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-        except Exception as e:
-            logger.error(f"Ошибка при проверке токена или получении пользователя: {e}")
+    def get_booking_queryset(self):
+        return BookingCatalog.objects.select_related('index', 'reader').only(*self.booking_fields)
+
+    def list_bookings(self, request, queryset):
+        filterset = BookingFilter(request.query_params, queryset=queryset)
+        if not filterset.is_valid():
             return Response(
-                {"detail": "Недействительный или истёкший токен"},
-                status=status.HTTP_401_UNAUTHORIZED
+                {"detail": "Ошибка валидации", "errors": filterset.errors},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        bookings = BookingCatalog.objects.all()
-        serializer = BookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        paginator = BookPagination()
+        page = paginator.paginate_queryset(filterset.qs, request, view=self)
+        return paginator.get_paginated_response(BookingSerializer(page, many=True).data)
 
-    def post(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
+
+class BookingListCreateView(BookingListMixin, APIView):
+    """
+    Список бронирований и создание нового бронирования с проверкой токена в куки
+    """
+    pagination_class = BookPagination
+    def get(self, request):
+        user = get_request_reader(request)
+        if not user:
             return Response(
-                {"detail": "Требуется авторизация: access_token не найден в cookies"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-        except Exception as e:
-            logger.error(f"Ошибка при проверке токена или получении пользователя: {e}")
+        # Администратор видит все бронирования, читатель - только свои
+        bookings = self.get_booking_queryset()
+        if not user.admin:
+            bookings = bookings.filter(reader_id=user.id)
+        return self.list_bookings(request, bookings)
+
+    def post(self, request):
+        user = get_request_reader(request)
+        if not user:
             return Response(
-                {"detail": "Недействительный или истёкший токен"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
@@ -602,20 +784,16 @@ class BookingListCreateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Проверка доступности книги (дублируется в модели, но оставляем для быстрой валидации)
-        book = BooksCatalog.objects.get(pk=serializer.validated_data['index'].id)
-        if book.quantity_remaining < serializer.validated_data['quantity']:
-            return Response(
-                {'error': 'Недостаточно экземпляров книги для бронирования'},
-                status=status.HTTP_400_BAD_REQUEST
+        # Создаем бронирование - количество списывается в модели условным UPDATE,
+        # поэтому при гонке за последний экземпляр здесь будет ValueError
+        try:
+            booking = serializer.save(
+                reader=user,
+                issued=False,
+                returned=False
             )
-
-        # Создаем бронирование - логика уменьшения количества в модели
-        booking = serializer.save(
-            reader=user,
-            issued=False,
-            returned=False
-        )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             BookingSerializer(booking).data,
@@ -634,18 +812,6 @@ class BookingDetailView(APIView):
         except BookingCatalog.DoesNotExist:
             return None
 
-    def get_user_from_token(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get(self, request, pk):
         booking = self.get_booking(pk)
         if not booking:
@@ -659,11 +825,11 @@ class BookingDetailView(APIView):
         if not booking:
             return Response({"detail": "Бронирование не найдено"}, status=status.HTTP_404_NOT_FOUND)
 
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response({"detail": "Требуется авторизация"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if booking.reader != user and not user.admin:
+        if booking.reader_id != user.id and not user.admin:
             return Response(
                 {"detail": "У вас нет прав для этого действия"},
                 status=status.HTTP_403_FORBIDDEN
@@ -689,11 +855,11 @@ class BookingDetailView(APIView):
         if not booking:
             return Response({"detail": "Бронирование не найдено"}, status=status.HTTP_404_NOT_FOUND)
 
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response({"detail": "Требуется авторизация"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if booking.reader != user and not user.admin:
+        if booking.reader_id != user.id and not user.admin:
             return Response(
                 {"detail": "У вас нет прав для этого действия"},
                 status=status.HTTP_403_FORBIDDEN
@@ -703,64 +869,57 @@ class BookingDetailView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserBookingsListView(generics.ListAPIView):
-    serializer_class = BookingSerializer
-    pagination_class = BookPagination
-    def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        return BookingCatalog.objects.filter(reader_id=user_id)
-
-
-class UserBookingsView(APIView):
+class UserBookingsListView(BookingListMixin, APIView):
     """
-    Список бронирований текущего пользователя
+    Список бронирований указанного читателя - ему самому или администратору
     """
 
-    def get(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
+    def get(self, request, user_id):
+        user = get_request_reader(request)
+        if not user:
             return Response(
-                {"detail": "Требуется авторизация: access_token не найден в cookies"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-        except Exception as e:
-            logger.error(f"Ошибка при проверке токена или получении пользователя: {e}")
+        if user.id != user_id and not user.admin:
             return Response(
-                {"detail": "Недействительный или истёкший токен"},
-                status=status.HTTP_401_UNAUTHORIZED
+                {"detail": "У вас нет прав для этого действия"},
+                status=status.HTTP_403_FORBIDDEN
             )
 
-        bookings = BookingCatalog.objects.filter(reader=user)
-        serializer = BookingSerializer(bookings, many=True)
-        pagination_class = BookPagination
-        return Response(serializer.data)
+        return self.list_bookings(request, self.get_booking_queryset().filter(reader_id=user_id))
 
-class ProfileUpdateView(APIView):
+
+class UserBookingsView(BookingListMixin, APIView):
     """
-    Обновление профиля пользователя
+    Список бронирований текущего пользователя
     """
-    def put(self, request):
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
+
+    def get(self, request):
+        user = get_request_reader(request)
+        if not user:
             return Response(
-                {"detail": "Требуется авторизация: access_token не найден в cookies"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-        except Exception as e:
-            logger.error(f"Ошибка при проверке токена или получении пользователя: {e}")
+        return self.list_bookings(request, self.get_booking_queryset().filter(reader_id=user.id))
+
+class ProfileUpdateView(APIView):
+    """
+    Обновление профиля пользователя
+    """
+    def put(self, request):
+        user = get_request_reader(request)
+        if not user:
             return Response(
-                {"detail": "Недействительный или истёкший токен"},
+                {"detail": "Требуется авторизация: access_token не найден или недействителен"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        # Для смены пароля и сохранения нужна полная запись читателя
+        user = ReadersCatalog.objects.get(id=user.id)
         serializer = ReadersCatalogSerializer(user, data=request.data, partial=True)
         if not serializer.is_valid():
             return Response(
@@ -789,23 +948,9 @@ class OrderListView(APIView):
     filterset_class = OrderFilter
     pagination_class = BookPagination
 
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get(self, request):
         """Получение списка заказов пользователя"""
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response(
                 {"detail": "Требуется авторизация: access_token не найден или недействителен"},
@@ -826,7 +971,7 @@ class OrderListView(APIView):
 
     def post(self, request):
         """Создание нового заказа"""
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response(
                 {"detail": "Требуется авторизация: access_token не найден или недействителен"},
@@ -853,7 +998,7 @@ class OrderListView(APIView):
 
     def delete(self, request, id):
         """Удаление заказа"""
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user:
             return Response(
                 {"detail": "Требуется авторизация"},
@@ -878,23 +1023,9 @@ class OrderListView(APIView):
             )
 
 class StatisticsView(APIView):
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get(self, request):
         # Проверка прав администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -902,23 +1033,14 @@ class StatisticsView(APIView):
             )
 
         try:
-            # Получаем все данные за минимальное количество запросов
-            current_date = timezone.now().date()
-
-            # Основная статистика
-            stats = {
-                'books': BooksCatalog.objects.count(),
-                'users': ReadersCatalog.objects.count(),
-                'orders': OrderCatalog.objects.filter(confirmed=False).count(),
-                'bookings': BookingCatalog.objects.filter(returned=False).count(),
-            }
-
-            # Должники - только выданные и не возвращенные книги с просроченной датой
-            stats['debtors'] = BookingCatalog.objects.filter(
-                issued=True,
-                returned=False,
-                date_return__lt=current_date
-            ).values('reader').distinct().count()
+            if request.query_params.get('exact') in ('1', 'true'):
+                # Точные значения одним запросом с условными COUNT
+                stats = exact_counters()
+            else:
+                # Счетчики поддерживаются при записи и сверяются командой reconcile_counters
+                stats = get_counters()
+                # Должники - только выданные и не возвращенные книги с просроченной датой
+                stats['debtors'] = debtor_count()
 
             serializer = StatisticsSerializer(stats)
             return Response(serializer.data)
@@ -936,7 +1058,7 @@ class BookAdminListView(AdminPermissionMixin, generics.ListCreateAPIView):
     Административный список книг (с возможностью создания)
     """
     pagination_class = BookPagination
-    queryset = BooksCatalog.objects.all().prefetch_related(
+    queryset = BooksCatalog.objects.defer('search_vector').prefetch_related(
         Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
         'genres'
     )
@@ -949,10 +1071,7 @@ class BookAdminListView(AdminPermissionMixin, generics.ListCreateAPIView):
         headers = self.get_success_headers(serializer.data)
 
         # Очищаем кеш
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version(book_ids=[serializer.instance.id])
 
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
@@ -961,7 +1080,7 @@ class BookAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyAP
     """
     Детальное представление книги для администратора (CRUD)
     """
-    queryset = BooksCatalog.objects.all().prefetch_related(
+    queryset = BooksCatalog.objects.defer('search_vector').prefetch_related(
         Prefetch('authorsbooks_set', queryset=AuthorsBooks.objects.select_related('author')),
         'genres'
     )
@@ -975,12 +1094,14 @@ class BookAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyAP
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
+        # Авторы и жанры могли измениться, сбрасываем prefetch-кэш экземпляра
+        instance._prefetched_objects_cache = {}
+        instance.__dict__.pop('_cached_authors', None)
+
         # Очищаем кеш
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version(book_ids=[instance.id])
         cache.delete(f'book_{instance.id}')
+        publish_availability(instance.id, quantity_remaining=instance.quantity_remaining)
 
         return Response(serializer.data)
 
@@ -1000,14 +1121,12 @@ class BookAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyAP
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        book_id = instance.id
         self.perform_destroy(instance)
 
         # Очищаем кеш
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
-        cache.delete(f'book_{instance.id}')
+        bump_catalog_version(book_ids=[book_id])
+        cache.delete(f'book_{book_id}')
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -1037,12 +1156,9 @@ class AuthorAdminView(AdminPermissionMixin, generics.ListCreateAPIView):
     pagination_class = BookPagination
 
     def perform_create(self, serializer):
-        serializer.save()
+        author = serializer.save()
         # Очищаем кеш книг, так как мог измениться список авторов
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version(author_ids=[author.id])
 
 class AuthorAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyAPIView):
     """
@@ -1053,12 +1169,10 @@ class AuthorAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroy
     lookup_field = 'id'
 
     def perform_update(self, serializer):
-        serializer.save()
+        author = serializer.save()
+        update_search_vector(AuthorsBooks.objects.filter(author=author).values('book_id'))
         # Очищаем кеш книг, так как мог измениться автор
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version(author_ids=[author.id])
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -1068,12 +1182,10 @@ class AuthorAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroy
                 {"detail": "Невозможно удалить автора, так как есть связанные книги"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        author_id = instance.id
         self.perform_destroy(instance)
         # Очищаем кеш книг
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version(author_ids=[author_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class GenreAdminView(AdminPermissionMixin, generics.ListCreateAPIView):
@@ -1087,10 +1199,7 @@ class GenreAdminView(AdminPermissionMixin, generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
         # Очищаем кеш книг, так как мог измениться список жанров
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version()
 
 class GenreAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyAPIView):
     """
@@ -1101,12 +1210,10 @@ class GenreAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyA
     lookup_field = 'id'
 
     def perform_update(self, serializer):
-        serializer.save()
+        genre = serializer.save()
+        update_search_vector(genre.books.values('id'))
         # Очищаем кеш книг, так как мог измениться жанр
-        keys = cache.keys('books_*')  # Redis поддерживает keys()
-        if keys:
-            cache.delete_many(keys)
-        cache.delete('popular_books_top10')
+        bump_catalog_version()
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -1118,60 +1225,27 @@ class GenreAdminDetailView(AdminPermissionMixin, generics.RetrieveUpdateDestroyA
             )
         self.perform_destroy(instance)
         # Очищаем кеш книг
-        cache.delete_many(keys=cache.keys('books_*'))
+        bump_catalog_version()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class BookingAdminView(APIView):
+class BookingAdminView(BookingListMixin, APIView):
     pagination_class = BookPagination
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get(self, request):
         # Проверка прав администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        booking_id = request.query_params.get('id', '')
-        queryset = BookingCatalog.objects.all().select_related('index', 'reader')
-
-        if booking_id:
-            queryset = queryset.filter(id=booking_id)
-
-        serializer = BookingSerializer(queryset, many=True)
-        return Response(serializer.data)
+        # ?id=, ?status=, ?date_from=, ?book= и т.д. - см. BookingFilter;
+        # с параметром cursor используется keyset-пагинация
+        return self.list_bookings(request, self.get_booking_queryset())
 
 
 class BookingAdminDetailView(APIView):
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get_booking(self, pk):
         try:
             return BookingCatalog.objects.get(pk=pk)
@@ -1180,7 +1254,7 @@ class BookingAdminDetailView(APIView):
 
     def get(self, request, pk):
         # Проверка прав администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1199,7 +1273,7 @@ class BookingAdminDetailView(APIView):
 
     def patch(self, request, pk):
         # Проверка прав администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1239,26 +1313,33 @@ class BookingAdminDetailView(APIView):
             )
 
 
-class AdminOrderListView(APIView):
-    pagination_class = BookPagination
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
+class BookingAdminBulkView(AdminPermissionMixin, APIView):
+    """
+    Пакетная выдача/возврат/отмена бронирований:
+    {"items": [{"id": 1, "action": "issue|return|cancel"}, ...]}
+    """
+    def post(self, request):
+        serializer = BookingBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"detail": "Ошибка валидации", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
+        results = apply_booking_actions(serializer.validated_data['items'])
+        return Response({
+            'results': results,
+            'processed': sum(1 for result in results if result['status'] == 'ok'),
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+        })
 
+
+class AdminOrderListView(APIView):
+    pagination_class = BookPagination
     def get(self, request):
         """Получение списка всех заказов"""
         # Проверяем права администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1266,7 +1347,13 @@ class AdminOrderListView(APIView):
             )
 
         # Получаем все заказы
-        orders = OrderCatalog.objects.all().order_by('-id')
+        orders = OrderCatalog.objects.all().select_related('reader').order_by('-id')
+
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(orders, request)
+            return paginator.get_paginated_response(OrderSerializer(page, many=True).data)
+
         serializer = OrderSerializer(orders, many=True)
 
         return Response(
@@ -1281,20 +1368,6 @@ class AdminOrderListView(APIView):
 class AdminOrderDetailView(APIView):
     pagination_class = BookPagination
 
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
-
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
-
     def get_order(self, order_id):
         try:
             return OrderCatalog.objects.get(id=order_id)
@@ -1304,7 +1377,7 @@ class AdminOrderDetailView(APIView):
     def get(self, request, order_id):
         """Получение информации о конкретном заказе"""
         # Проверяем права администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1324,7 +1397,7 @@ class AdminOrderDetailView(APIView):
     def patch(self, request, order_id):
         """Изменение статуса подтверждения заказа"""
         # Проверяем права администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1381,29 +1454,6 @@ class ReaderListView(AdminPermissionMixin, generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_class = DebtorFilter
 
-    def list(self, request, *args, **kwargs):
-        try:
-            # Проверка прав администратора
-            self.check_admin_permissions(request)
-
-            # Стандартная обработка запроса
-            queryset = self.filter_queryset(self.get_queryset())
-            page = self.paginate_queryset(queryset)
-
-            if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
-
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
-
-        except PermissionDenied as e:
-            # Возвращаем ошибку с явным указанием рендерера
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_403_FORBIDDEN,
-                content_type='application/json'  # Явно указываем тип контента
-            )
 
 class ReaderDetailView(AdminPermissionMixin, generics.RetrieveAPIView):
     queryset = ReadersCatalog.objects.all()
@@ -1422,27 +1472,23 @@ class ReaderAdminUpdateView(AdminPermissionMixin, generics.UpdateAPIView):
                 {"detail": "Вы не можете снять с себя права администратора"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        return super().update(request, *args, **kwargs)
-
+        was_admin = instance.admin
+        response = super().update(request, *args, **kwargs)
 
-class GenerateReportView(APIView):
-    def get_user_from_token(self, request):
-        """Получаем пользователя из access_token в куках"""
-        access_token = request.COOKIES.get('access_token')
-        if not access_token:
-            return None
+        # Старые токены содержат прежнее значение admin
+        if response.data.get('admin', was_admin) != was_admin:
+            revoke_reader_tokens(instance.id)
+        return response
 
-        try:
-            token = AccessToken(access_token)
-            user = ReadersCatalog.objects.get(id=token['user_id'])
-            return user
-        except Exception as e:
-            logger.error(f"Ошибка получения пользователя из токена: {e}")
-            return None
 
+class GenerateReportView(APIView):
+    """
+    Ставит построение отчета в очередь (воркер run_report_worker) и сразу
+    возвращает задачу; готовность проверяется через ReportStatusView
+    """
     def post(self, request):
         # Проверка прав администратора
-        user = self.get_user_from_token(request)
+        user = get_request_reader(request)
         if not user or not user.admin:
             return Response(
                 {"detail": "Требуются права администратора"},
@@ -1453,114 +1499,72 @@ class GenerateReportView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        start_date = serializer.validated_data['start_date']
-        end_date = serializer.validated_data['end_date'] + timedelta(days=1)  # Чтобы включить весь день окончания
+        job, _ = enqueue_report(
+            serializer.validated_data['start_date'],
+            serializer.validated_data['end_date'],
+            user=user
+        )
+        return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        # Создаем Excel файл в памяти
-        output = BytesIO()
-        writer = pd.ExcelWriter(output, engine='xlsxwriter')
 
-        # 1. Книги у читателей (issued = True и returned = False)
-        issued_books = BookingCatalog.objects.filter(
-            issued=True,
-            returned=False,
-            date_issue__gte=start_date,
-            date_issue__lt=end_date
-        ).select_related('index', 'reader')
-
-        issued_data = []
-        for booking in issued_books:
-            issued_data.append({
-                'Название книги': booking.index.title,
-                'Автор(ы)': booking.index.get_authors_names(),
-                'Читатель': f"{booking.reader.surname} {booking.reader.name}",
-                'Дата выдачи': booking.date_issue,
-                'Дата возврата': booking.date_return,
-                'Количество': booking.quantity,
-                'Статус': 'На руках'
-            })
-
-        if issued_data:
-            df_issued = pd.DataFrame(issued_data)
-            df_issued.to_excel(writer, sheet_name='Книги у читателей', index=False)
-
-        # 2. Популярные книги (10 самых бронированных)
-        popular_books = BookingCatalog.objects.filter(
-            date_issue__gte=start_date,
-            date_issue__lt=end_date
-        ).values(
-            'index__title',
-            'index__authors_mark'
-        ).annotate(
-            total_bookings=Count('id')
-        ).order_by('-total_bookings')[:10]
-
-        popular_books_data = []
-        for book in popular_books:
-            popular_books_data.append({
-                'Название книги': book['index__title'],
-                'Автор(ы)': book['index__authors_mark'],
-                'Количество бронирований': book['total_bookings']
-            })
-
-        if popular_books_data:
-            df_popular = pd.DataFrame(popular_books_data)
-            df_popular.to_excel(writer, sheet_name='Популярные книги', index=False)
-
-        # 3. Популярные авторы (10 самых бронированных)
-        popular_authors = BookingCatalog.objects.filter(
-            date_issue__gte=start_date,
-            date_issue__lt=end_date
-        ).values(
-            'index__authorsbooks__author__author_surname',
-            'index__authorsbooks__author__author_name'
-        ).annotate(
-            total_bookings=Count('id')
-        ).order_by('-total_bookings')[:10]
-
-        authors_data = []
-        for author in popular_authors:
-            authors_data.append({
-                'Фамилия автора': author['index__authorsbooks__author__author_surname'],
-                'Имя автора': author['index__authorsbooks__author__author_name'],
-                'Количество бронирований': author['total_bookings']
-            })
-
-        if authors_data:
-            df_authors = pd.DataFrame(authors_data)
-            df_authors.to_excel(writer, sheet_name='Популярные авторы', index=False)
-
-        # 4. Популярные жанры (10 самых бронированных)
-        popular_genres = BookingCatalog.objects.filter(
-            date_issue__gte=start_date,
-            date_issue__lt=end_date
-        ).values(
-            'index__booksgenres__genre__name'
-        ).annotate(
-            total_bookings=Count('id')
-        ).order_by('-total_bookings')[:10]
-
-        genres_data = []
-        for genre in popular_genres:
-            genres_data.append({
-                'Жанр': genre['index__booksgenres__genre__name'],
-                'Количество бронирований': genre['total_bookings']
-            })
-
-        if genres_data:
-            df_genres = pd.DataFrame(genres_data)
-            df_genres.to_excel(writer, sheet_name='Популярные жанры', index=False)
-
-        # Сохраняем Excel файл
-        writer.close()
-        output.seek(0)
-
-        # Создаем HTTP ответ с файлом
-        response = HttpResponse(
-            output.getvalue(),
+class ReportStatusView(AdminPermissionMixin, generics.RetrieveAPIView):
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+    lookup_field = 'id'
+    lookup_url_kwarg = 'job_id'
+
+
+class ReportDownloadView(AdminPermissionMixin, APIView):
+    def get(self, request, job_id):
+        try:
+            job = ReportJob.objects.get(id=job_id)
+        except ReportJob.DoesNotExist:
+            return Response({"detail": "Отчет не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+        if job.status != ReportJob.STATUS_DONE or not job.file:
+            return Response(
+                {"detail": "Отчет еще не готов", "status": job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=f'library_report_{job.start_date}_{job.end_date}.xlsx',
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename=library_report_{start_date}_{end_date}.xlsx'
+
+
+class ExportView(AdminPermissionMixin, APIView):
+    """
+    Потоковая выгрузка /admin/export/<books|bookings|readers>.<csv|ndjson>.
+    Для бронирований можно задать период ?start_date=&end_date= (по дате бронирования)
+    """
+    def get(self, request, entity, export_format):
+        if entity not in EXPORT_ENTITIES or export_format not in EXPORT_FORMATS:
+            return Response({"detail": "Неизвестный тип выгрузки"}, status=status.HTTP_404_NOT_FOUND)
+
+        filters = {}
+        if entity == 'bookings':
+            for param, lookup in (('start_date', 'date_issue__gte'), ('end_date', 'date_issue__lte')):
+                value = request.query_params.get(param)
+                if not value:
+                    continue
+                try:
+                    filters[lookup] = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    return Response(
+                        {"detail": f"Некорректная дата {param}, ожидается YYYY-MM-DD"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+        # Под ASGI нужен асинхронный итератор, иначе Django буферизует выгрузку целиком
+        stream = astream_export if is_asgi_request(request) else stream_export
+        response = StreamingHttpResponse(
+            stream(entity, export_format, filters),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename={entity}.{export_format}'
         return response
 
 
@@ -1608,6 +1612,7 @@ class ReaderAdminDeleteView(AdminPermissionMixin, generics.DestroyAPIView):
             )
 
         self.perform_destroy(instance)
+        revoke_reader_tokens(instance.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -1618,7 +1623,7 @@ class BookCoverView(APIView):
 
     def patch(self, request, id):
         try:
-            book = BooksCatalog.objects.get(id=id)
+            book = BooksCatalog.objects.defer('search_vector').get(id=id)
         except BooksCatalog.DoesNotExist:
             return Response(
                 {"detail": "Книга не найдена"},
@@ -1633,6 +1638,7 @@ class BookCoverView(APIView):
 
         book.cover = request.FILES['cover']
         book.save()
+        bump_catalog_version()
 
         return Response(
             {"detail": "Обложка успешно обновлена", "cover_url": book.cover.url},
@@ -1641,7 +1647,7 @@ class BookCoverView(APIView):
 
     def delete(self, request, id):
         try:
-            book = BooksCatalog.objects.get(id=id)
+            book = BooksCatalog.objects.defer('search_vector').get(id=id)
         except BooksCatalog.DoesNotExist:
             return Response(
                 {"detail": "Книга не найдена"},
@@ -1655,6 +1661,7 @@ class BookCoverView(APIView):
             )
 
         book.cover.delete(save=True)  # Удаляем файл и сохраняем модель
+        bump_catalog_version()
 
         return Response(
             {"detail": "Обложка успешно удалена"},
@@ -1,29 +1,46 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState } from 'react';
 import apiClient from '../../api/client';
 import "./booking.css";
 
 const Bookings_adm = () => {
-    const [allBookings, setAllBookings] = useState([]);
     const [bookings, setBookings] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [searchTerm, setSearchTerm] = useState('');
     const [searchBy, setSearchBy] = useState('id');
+    const [appliedSearch, setAppliedSearch] = useState({ by: 'id', term: '' });
     const [pagination, setPagination] = useState({
         page: 1,
         pageSize: 12,
         total: 0
     });
 
-    const fetchBookings = async () => {
+    // Параметры фильтрации на сервере (см. BookingFilter)
+    const searchParams = {
+        id: 'id',
+        reader: 'reader_name',
+        book: 'search'
+    };
+
+    const fetchBookings = async (page = pagination.page, search = appliedSearch) => {
         setLoading(true);
         setError('');
         try {
-            const response = await apiClient.get('/admin/bookings/');
-            setAllBookings(response.data.results || response.data);
+            const params = {
+                page,
+                page_size: pagination.pageSize
+            };
+            const term = search.term.trim();
+            if (term) {
+                params[searchParams[search.by]] = term;
+            }
+
+            const response = await apiClient.get('/admin/bookings/', { params });
+            setBookings(response.data.results || response.data);
             setPagination(prev => ({
                 ...prev,
-                total: response.data.count || response.data.length
+                page,
+                total: response.data.count ?? response.data.length
             }));
         } catch (err) {
             setError('Произошла ошибка при загрузке бронирований');
@@ -33,35 +50,14 @@ const Bookings_adm = () => {
         }
     };
 
-    // Фильтрация бронирований на фронтенде
-    const filteredBookings = useMemo(() => {
-        if (!searchTerm) return allBookings;
-
-        const term = searchTerm.toLowerCase();
-        return allBookings.filter(booking => {
-            if (searchBy === 'id') {
-                return booking.id.toString().includes(term);
-            } else if (searchBy === 'reader') {
-                return booking.reader_name.toLowerCase().includes(term);
-            } else if (searchBy === 'book') {
-                return booking.book_title.toLowerCase().includes(term);
-            }
-            return true;
-        });
-    }, [allBookings, searchTerm, searchBy]);
-
-    // Пагинация
-    const paginatedBookings = useMemo(() => {
-        const start = (pagination.page - 1) * pagination.pageSize;
-        return filteredBookings.slice(start, start + pagination.pageSize);
-    }, [filteredBookings, pagination.page, pagination.pageSize]);
-
     const handleSearchSubmit = () => {
-        setPagination(prev => ({ ...prev, page: 1 }));
+        const search = { by: searchBy, term: searchTerm };
+        setAppliedSearch(search);
+        fetchBookings(1, search);
     };
 
     const handlePageChange = (newPage) => {
-        setPagination(prev => ({ ...prev, page: newPage }));
+        fetchBookings(newPage);
     };
 
     const handleStatusChange = async (bookingId, field) => {
@@ -77,17 +73,10 @@ const Bookings_adm = () => {
     };
 
     useEffect(() => {
-        fetchBookings();
+        fetchBookings(1);
     }, []);
 
-    useEffect(() => {
-        setPagination(prev => ({
-            ...prev,
-            total: filteredBookings.length
-        }));
-    }, [filteredBookings]);
-
-    if (loading && allBookings.length === 0) {
+    if (loading && bookings.length === 0) {
         return <div className="main_order_container">Загрузка...</div>;
     }
 
@@ -152,9 +141,9 @@ const Bookings_adm = () => {
             )}
 
             {/* Список бронирований */}
-            {paginatedBookings.length > 0 ? (
+            {bookings.length > 0 ? (
                 <div className="books-grid">
-                    {paginatedBookings.map((booking) => (
+                    {bookings.map((booking) => (
                         <div key={booking.id} className="book-card">
                             <div className="book-info">
                                 <h3>ID:{booking.id}</h3>
@@ -189,7 +178,7 @@ const Bookings_adm = () => {
                 </div>
             ) : (
                 <p className="no-books">
-                    {allBookings.length === 0 ? 'Нет данных о бронированиях' : 'Бронирования не найдены'}
+                    {appliedSearch.term ? 'Бронирования не найдены' : 'Нет данных о бронированиях'}
                 </p>
             )}
 
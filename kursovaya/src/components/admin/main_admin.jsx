@@ -1,8 +1,11 @@
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import './main_admin.css';
 import apiClient from '../../api/client';
 
+// Интервал опроса статистики, если сервер не поддерживает server-sent events
+const STATS_POLL_INTERVAL = 30000;
+
 const Main_adm = () => {
   const [stats, setStats] = useState({
     books: 0,
@@ -14,30 +17,63 @@ const Main_adm = () => {
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(true);
 
+  const fetchStatistics = useCallback(async () => {
+    try {
+      const response = await apiClient.get('/statistics/');
+
+      if (response.data) {
+        setStats({
+          books: response.data.books || 0,
+          users: response.data.users || 0,
+          orders: response.data.orders || 0,
+          bookings: response.data.bookings || 0,
+          debtors: response.data.debtors || 0
+        });
+      }
+    } catch (err) {
+      console.error('Ошибка при загрузке статистики:', err);
+      setError(err.response?.data?.message || 'Ошибка загрузки статистики');
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
   useEffect(() => {
-    const fetchStatistics = async () => {
-      try {
-        const response = await apiClient.get('/statistics/');
+    fetchStatistics();
+  }, [fetchStatistics]);
 
-        if (response.data) {
-          setStats({
-            books: response.data.books || 0,
-            users: response.data.users || 0,
-            orders: response.data.orders || 0,
-            bookings: response.data.bookings || 0,
-            debtors: response.data.debtors || 0
-          });
-        }
-      } catch (err) {
-        console.error('Ошибка при загрузке статистики:', err);
-        setError(err.response?.data?.message || 'Ошибка загрузки статистики');
-      } finally {
-        setLoading(false);
+  // Изменения статистики приходят с сервера (server-sent events), без повторных запросов
+  useEffect(() => {
+    let pollTimer = null;
+    const source = new EventSource(`${apiClient.defaults.baseURL}/events/`, { withCredentials: true });
+
+    // Сервер без ASGI отвечает 204 - EventSource закрывается, переходим на опрос
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && pollTimer === null) {
+        pollTimer = setInterval(fetchStatistics, STATS_POLL_INTERVAL);
       }
     };
 
-    fetchStatistics();
-  }, []);
+    source.addEventListener('stats', (event) => {
+      const { delta = {}, values = {} } = JSON.parse(event.data);
+      setStats(prev => {
+        const next = { ...prev, ...values };
+        Object.entries(delta).forEach(([key, value]) => {
+          if (key in next) {
+            next[key] = Math.max(0, next[key] + value);
+          }
+        });
+        return next;
+      });
+    });
+
+    return () => {
+      source.close();
+      if (pollTimer !== null) {
+        clearInterval(pollTimer);
+      }
+    };
+  }, [fetchStatistics]);
 
   if (loading) {
     return (
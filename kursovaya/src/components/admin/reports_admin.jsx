@@ -23,16 +23,24 @@ const Reports_adm = () => {
       setLoading(true);
       message.loading('Генерация отчёта...', 0);
 
-      const response = await apiClient.post(
-        '/report/',
-        {
-          start_date: startDate,
-          end_date: endDate
-        },
-        {
-          responseType: 'blob' // Добавляем responseType в конфиг
-        }
-      );
+      // Отчёт строится в фоне: ставим задачу и ждём её готовности
+      let { data: job } = await apiClient.post('/report/', {
+        start_date: startDate,
+        end_date: endDate
+      });
+
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        ({ data: job } = await apiClient.get(`/report/${job.id}/`));
+      }
+
+      if (job.status !== 'done') {
+        throw new Error(job.error || 'Ошибка при генерации отчёта');
+      }
+
+      const response = await apiClient.get(job.download_url, {
+        responseType: 'blob'
+      });
 
       // Создаем URL для скачивания файла
       const url = window.URL.createObjectURL(new Blob([response.data]));